@@ -0,0 +1,7 @@
+"""Statistics shared by the benchmark scripts."""
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of values, pct as a fraction (0.99 for p99); 0.0 when empty."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
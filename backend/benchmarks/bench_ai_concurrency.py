@@ -0,0 +1,115 @@
+"""
+AIService throughput against a local stub LLM server.
+
+Starts benchmarks/stub_llm_server.py with a fixed latency, points the selected
+provider at it and sends batches of concurrent get_response calls. With async
+provider clients throughput should grow roughly linearly with concurrency
+(concurrency / latency) instead of staying at one request per latency.
+Run from the backend folder: python benchmarks/bench_ai_concurrency.py
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Stub server did not start on port {port}")
+
+
+def configure_provider(provider: str, port: int) -> None:
+    """Point the provider's SDK at the stub server before AIService is imported."""
+    base = f"http://127.0.0.1:{port}"
+    os.environ["AI_PROVIDER"] = provider
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lea-bench-"))
+    if provider == "openai":
+        os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ["OPENAI_BASE_URL"] = f"{base}/v1"
+    elif provider == "groq":
+        os.environ["GROQ_API_KEY"] = "stub"
+        os.environ["GROQ_BASE_URL"] = base
+    elif provider == "gemini":
+        os.environ["GEMINI_API_KEY"] = "stub"
+        os.environ["GEMINI_BASE_URL"] = base
+
+
+async def run_level(ai_service, profile, messages, concurrency: int, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(
+            ai_service.get_response(profile=profile, messages=messages)
+            for _ in range(concurrency)
+        ))
+    elapsed = time.perf_counter() - start
+    return concurrency * rounds / elapsed, elapsed
+
+
+async def main_async(args) -> None:
+    from src.models.schemas import StudentProfile, Message
+    from src.services.ai_service import ai_service
+    
+    profile = StudentProfile(
+        student_id="bench", name="Bench", email="bench@example.com", current_level="B1"
+    )
+    messages = [Message(role="user", content="Erkläre mir bitte den Dativ.")]
+    ideal_single = 1000 / args.latency_ms
+    
+    print("=" * 60)
+    print(f"provider={args.provider} stub latency={args.latency_ms:.0f} ms")
+    print(f"{'concurrency':>12} {'req/s':>12} {'ideal req/s':>14} {'efficiency':>12}")
+    print("-" * 60)
+    for concurrency in args.levels:
+        throughput, _ = await run_level(
+            ai_service, profile, messages, concurrency, args.rounds
+        )
+        ideal = ideal_single * concurrency
+        print(f"{concurrency:>12} {throughput:>12.1f} {ideal:>14.1f} {throughput / ideal:>11.0%}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--provider", choices=["openai", "groq", "gemini"], default="openai")
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, str(Path(__file__).with_name("stub_llm_server.py")),
+        "--port", str(port), "--latency-ms", str(args.latency_ms),
+    ])
+    try:
+        wait_for_port(port)
+        configure_provider(args.provider, port)
+        asyncio.run(main_async(args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
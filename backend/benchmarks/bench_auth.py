@@ -0,0 +1,104 @@
+"""
+Login throughput and latency under concurrent load.
+
+Seeds accounts with bcrypt password hashes, then runs waves of concurrent
+AuthController.login calls while a heartbeat task measures event loop stalls.
+Reports logins per second per hashing core, latency percentiles and the worst
+loop stall (which stays small now that bcrypt runs on its own thread pool).
+Run from the backend folder: python benchmarks/bench_auth.py --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lea-bench-"))
+
+from src.config.settings import settings  # noqa: E402
+from src.models.schemas import LoginRequest, StudentProfile  # noqa: E402
+from src.services.storage_service import storage_service  # noqa: E402
+from src.services.password_hasher import password_hasher  # noqa: E402
+from src.controllers.auth_controller import auth_controller  # noqa: E402
+from _stats import percentile  # noqa: E402
+
+PASSWORD = "sicheres-passwort"
+
+
+def seed(accounts: int) -> list:
+    password_hash = password_hasher.pwd_context.hash(PASSWORD)
+    emails = []
+    for i in range(accounts):
+        email = f"auth{i}-{uuid.uuid4().hex[:6]}@example.com"
+        storage_service.save_profile(StudentProfile(
+            student_id=str(uuid.uuid4()),
+            name=f"Auth {i}",
+            email=email,
+            password_hash=password_hash,
+            current_level="A2",
+        ))
+        emails.append(email)
+    return emails
+
+
+async def heartbeat(stop: asyncio.Event, delays: list, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append(time.perf_counter() - start - interval)
+
+
+async def main_async(args) -> None:
+    emails = seed(args.accounts)
+    latencies = []
+    
+    async def login(email: str) -> None:
+        start = time.perf_counter()
+        response = await auth_controller.login(LoginRequest(email=email, password=PASSWORD))
+        latencies.append(time.perf_counter() - start)
+        assert response.success, response.message
+    
+    delays: list = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, delays))
+    
+    start = time.perf_counter()
+    for i in range(0, args.logins, args.concurrency):
+        batch = [emails[(i + j) % len(emails)] for j in range(min(args.concurrency, args.logins - i))]
+        await asyncio.gather(*(login(email) for email in batch))
+    elapsed = time.perf_counter() - start
+    
+    stop.set()
+    await beat
+    
+    cores = min(password_hasher.workers, os.cpu_count() or 1)
+    print("=" * 56)
+    print(f"bcrypt rounds={settings.bcrypt_rounds} hash workers={password_hasher.workers} "
+          f"cores={os.cpu_count()} concurrency={args.concurrency}")
+    print("-" * 56)
+    print(f"  logins/s           {len(latencies) / elapsed:10.1f}")
+    print(f"  logins/s per core  {len(latencies) / elapsed / cores:10.1f}")
+    print(f"  latency p50        {percentile(latencies, 0.50) * 1000:10.1f} ms")
+    print(f"  latency p99        {percentile(latencies, 0.99) * 1000:10.1f} ms")
+    print(f"  max loop stall     {percentile(delays, 1.0) * 1000:10.1f} ms")
+    print("=" * 56)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
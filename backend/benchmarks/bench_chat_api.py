@@ -0,0 +1,158 @@
+"""
+End-to-end chat load test against the full FastAPI stack, fully offline.
+
+Starts the backend with AI_PROVIDER=mock in a temporary data folder, signs
+up students (with cheap bcrypt rounds) and has every simulated student send several turns, either
+through POST /api/chat/message or the SSE streaming endpoint. Reports
+throughput, latency percentiles and (for streaming) time to first token.
+Run from the backend folder: python benchmarks/bench_chat_api.py --students 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from _stats import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Backend did not become healthy")
+
+
+async def create_student(client: httpx.AsyncClient, i: int) -> tuple:
+    """Sign up a student; returns (student_id, auth headers)."""
+    response = await client.post("/api/auth/signup", json={
+        "name": f"Load Student {i}",
+        "email": f"load{i}@example.com",
+        "password": "load-test-password",
+        "current_level": "B1",
+    })
+    response.raise_for_status()
+    auth = response.json()
+    return auth["profile"]["student_id"], {"Authorization": f"Bearer {auth['access_token']}"}
+
+
+async def blocking_turn(client, student, session_id, text, stats):
+    student_id, headers = student
+    start = time.perf_counter()
+    response = await client.post("/api/chat/message", headers=headers, json={
+        "student_id": student_id, "session_id": session_id, "message": text,
+    })
+    response.raise_for_status()
+    stats["latency"].append(time.perf_counter() - start)
+    return response.json()["session_id"]
+
+
+async def streaming_turn(client, student, session_id, text, stats):
+    student_id, headers = student
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/chat/message/stream", headers=headers, json={
+        "student_id": student_id, "session_id": session_id, "message": text,
+    }) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+            elif line.startswith("data:") and event == "session":
+                session_id = json.loads(line[5:])["session_id"]
+            elif event == "error":
+                raise RuntimeError(line)
+    stats["latency"].append(time.perf_counter() - start)
+    stats["ttft"].append(first_token or 0.0)
+    return session_id
+
+
+async def simulate_student(client, student, turns, stream, stats):
+    session_id = None
+    turn = streaming_turn if stream else blocking_turn
+    for i in range(turns):
+        session_id = await turn(client, student, session_id, f"Frage {i}: Wie geht das?", stats)
+
+
+async def main_async(args, base_url: str) -> None:
+    limits = httpx.Limits(max_connections=args.students * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await wait_until_healthy(client)
+        students = await asyncio.gather(*(create_student(client, i) for i in range(args.students)))
+        
+        for stream in ([False, True] if args.mode == "both" else [args.mode == "stream"]):
+            stats = {"latency": [], "ttft": []}
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                simulate_student(client, student, args.turns, stream, stats) for student in students
+            ))
+            elapsed = time.perf_counter() - start
+            
+            label = "stream" if stream else "blocking"
+            print("=" * 64)
+            print(f"{label}: {args.students} students x {args.turns} turns in {elapsed:.1f} s")
+            print(f"  throughput   {len(stats['latency']) / elapsed:8.1f} turns/s")
+            print(f"  latency p50  {percentile(stats['latency'], 0.50) * 1000:8.0f} ms")
+            print(f"  latency p99  {percentile(stats['latency'], 0.99) * 1000:8.0f} ms")
+            if stream:
+                print(f"  TTFT p50     {percentile(stats['ttft'], 0.50) * 1000:8.0f} ms")
+                print(f"  TTFT p99     {percentile(stats['ttft'], 0.99) * 1000:8.0f} ms")
+        print("=" * 64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--mode", choices=["blocking", "stream", "both"], default="both")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    args = parser.parse_args()
+    
+    port = free_port()
+    env = dict(
+        os.environ,
+        AI_PROVIDER="mock",
+        BCRYPT_ROUNDS="4",
+        DATA_DIR=tempfile.mkdtemp(prefix="lea-bench-"),
+        MOCK_LATENCY_MS=str(args.latency_ms),
+        MOCK_TOKENS_PER_SECOND=str(args.tokens_per_second),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        asyncio.run(main_async(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
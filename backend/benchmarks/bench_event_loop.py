@@ -0,0 +1,110 @@
+"""
+Event loop responsiveness under parallel storage requests.
+
+Runs many concurrent session listings through the chat controller while a
+heartbeat task measures how late the event loop wakes it up. Blocking storage
+calls show up as heartbeat delays as long as the whole batch; with the async
+storage API only GIL hand-offs and GC pauses remain. Exits with status 1 if
+the async path's p99 stall exceeds --max-stall-ms.
+Run from the backend folder: python benchmarks/bench_event_loop.py
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lea-bench-"))
+os.environ.setdefault("STORAGE_CACHE_SIZE", "0")  # measure real disk reads
+os.environ.setdefault("GROQ_API_KEY", "bench")  # AIService is never called
+
+from src.models.schemas import ChatSession, Message  # noqa: E402
+from src.services.storage_service import storage_service  # noqa: E402
+from src.controllers.chat_controller import chat_controller  # noqa: E402
+from _stats import percentile  # noqa: E402
+
+
+def seed(sessions: int, messages: int) -> str:
+    """Create one student with many long sessions and return the student_id."""
+    student_id = str(uuid.uuid4())
+    for _ in range(sessions):
+        session = ChatSession(session_id=str(uuid.uuid4()), student_id=student_id)
+        session.messages = [
+            Message(role="user" if i % 2 == 0 else "assistant", content="Guten Tag! " * 30)
+            for i in range(messages)
+        ]
+        storage_service.save_session(session)
+    return student_id
+
+
+async def heartbeat(stop: asyncio.Event, interval: float, delays: list) -> None:
+    """Record how late each wake-up is compared to the requested interval."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append(time.perf_counter() - start - interval)
+
+
+async def run(label: str, request, concurrency: int, interval: float) -> float:
+    delays: list = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, interval, delays))
+    await asyncio.sleep(interval * 2)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    
+    stop.set()
+    await beat
+    p99 = percentile(delays, 0.99) * 1000
+    worst = percentile(delays, 1.0) * 1000
+    print(f"{label:<10} {elapsed * 1000:>12.1f} {p99:>14.1f} {worst:>14.1f}")
+    return p99
+
+
+async def main_async(args) -> int:
+    student_id = seed(args.sessions, args.messages)
+    
+    # Only lengths are kept so the results don't pile up and trigger GC pauses
+    async def blocking_request():
+        # What the routes did before: synchronous storage inside the coroutine
+        return len(storage_service.get_student_sessions(student_id))
+    
+    async def async_request():
+        return len(await chat_controller.get_student_sessions(student_id))
+    
+    print("=" * 56)
+    print(f"{'mode':<10} {'total (ms)':>12} {'p99 stall (ms)':>14} {'max stall (ms)':>14}")
+    print("-" * 56)
+    await run("blocking", blocking_request, args.concurrency, args.interval)
+    p99 = await run("async", async_request, args.concurrency, args.interval)
+    print("=" * 56)
+    
+    if p99 > args.max_stall_ms:
+        print(f"FAIL: event loop p99 stall {p99:.1f} ms (limit {args.max_stall_ms} ms)")
+        return 1
+    print(f"OK: event loop stayed responsive (limit {args.max_stall_ms} ms)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.001)
+    parser.add_argument("--max-stall-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
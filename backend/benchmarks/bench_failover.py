@@ -0,0 +1,160 @@
+"""
+Provider failover and hedging against local stub LLM servers.
+
+Points OpenAI (primary) and Groq (fallback) at two stub servers. In the tail
+scenario the primary answers a fraction of requests very slowly (keep it
+below 1 - HEDGE_PERCENTILE, or the percentile lands in the tail) and latency
+percentiles are compared with hedging off and on. In the failover scenario
+the primary answers a fraction of requests with 503, and every request must
+still succeed through the fallback. Reports which provider served the replies.
+Run from the backend folder: python benchmarks/bench_failover.py
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from _stats import percentile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+STUB = Path(__file__).with_name("stub_llm_server.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Stub server did not start on port {port}")
+
+
+def start_stub(port: int, *extra: str) -> subprocess.Popen:
+    # Cancelled hedge requests make the stub log client disconnects; keep them quiet
+    server = subprocess.Popen(
+        [sys.executable, str(STUB), "--port", str(port), *extra], stderr=subprocess.DEVNULL
+    )
+    wait_for_port(port)
+    return server
+
+
+def stop(server: subprocess.Popen) -> None:
+    server.terminate()
+    server.wait()
+
+
+async def run_scenario(ai_service, label: str, requests: int, concurrency: int) -> None:
+    from src.models.schemas import StudentProfile, Message
+    
+    profile = StudentProfile(
+        student_id="bench", name="Bench", email="bench@example.com", current_level="B1"
+    )
+    messages = [Message(role="user", content="Erkläre mir bitte den Dativ.")]
+    latencies, served, failures = [], Counter(), 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+    
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                reply = await ai_service.get_response(profile=profile, messages=messages)
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            served[reply.provider] += 1
+    
+    hedges_before = ai_service.hedges_fired
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    
+    print(f"{label}")
+    print(f"  p50 {percentile(latencies, 0.50) * 1000:7.0f} ms   p99 {percentile(latencies, 0.99) * 1000:7.0f} ms"
+          f"   failed {failures}/{requests}   hedges {ai_service.hedges_fired - hedges_before}")
+    print(f"  served by {dict(served)}")
+
+
+async def run_all(args, primary_port: int, latency: list, primary: subprocess.Popen) -> None:
+    # One event loop for all scenarios: the SDK clients keep connections bound to it
+    from src.config.settings import settings
+    from src.services.ai_service import ai_service
+    
+    try:
+        print("=" * 72)
+        settings.hedge_enabled = False
+        await run_scenario(
+            ai_service, f"tail ({args.slow_rate:.0%} of primary requests +{args.slow_ms:.0f} ms), hedging off",
+            args.requests, args.concurrency
+        )
+        settings.hedge_enabled = True
+        await run_scenario(
+            ai_service, f"tail, hedging on (p{settings.hedge_percentile * 100:.0f} of primary latency)",
+            args.requests, args.concurrency
+        )
+        
+        stop(primary)
+        primary = start_stub(primary_port, *latency, "--fail-rate", str(args.fail_rate))
+        settings.hedge_enabled = False
+        await run_scenario(
+            ai_service, f"failover ({args.fail_rate:.0%} of primary requests fail with 503)",
+            args.requests, args.concurrency
+        )
+        print("=" * 72)
+    finally:
+        stop(primary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--fail-rate", type=float, default=0.3)
+    args = parser.parse_args()
+    
+    primary_port, fallback_port = free_port(), free_port()
+    latency = ["--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.latency_ms / 4)]
+    fallback = start_stub(fallback_port, *latency)
+    primary = start_stub(primary_port, *latency, "--slow-rate", str(args.slow_rate), "--slow-ms", str(args.slow_ms))
+    
+    os.environ.update({
+        "AI_PROVIDER": "openai",
+        "AI_FALLBACK_PROVIDERS": '["groq"]',
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{primary_port}/v1",
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{fallback_port}",
+        "HEDGE_MIN_SAMPLES": "20",
+    })
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lea-bench-"))
+    
+    try:
+        asyncio.run(run_all(args, primary_port, latency, primary))
+    finally:
+        stop(fallback)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Session save acknowledgement latency per durability level.
+
+For each storage backend and SESSION_DURABILITY level, appends --turns turns
+to each of --sessions sessions in rounds --gap-ms apart (like learners
+chatting at the same time) and times save_session, i.e. how long a chat
+reply waits for persistence. Counts fsync calls made by the JSON backend
+(SQLite fsyncs internally), then closes the service and reopens the data to
+check that every acknowledged turn was stored.
+Run from the backend folder: python benchmarks/bench_persistence.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.config.settings import settings  # noqa: E402
+from src.models.schemas import ChatSession, Message  # noqa: E402
+from src.services.storage_service import JSONStorageService  # noqa: E402
+from src.services.sqlite_storage_service import SQLiteStorageService  # noqa: E402
+from _stats import percentile  # noqa: E402
+
+BACKENDS = {
+    "json": lambda path: JSONStorageService(data_dir=path, session_storage_mode="json"),
+    "json-log": lambda path: JSONStorageService(data_dir=path, session_storage_mode="log"),
+    "sqlite": lambda path: SQLiteStorageService(db_path=os.path.join(path, "lea.db")),
+}
+
+fsyncs = 0
+_os_fsync = os.fsync
+
+
+def counting_fsync(fd: int) -> None:
+    global fsyncs
+    fsyncs += 1
+    _os_fsync(fd)
+
+
+def run(backend: str, durability: str, sessions: int, turns: int, gap: float) -> dict:
+    global fsyncs
+    settings.session_durability = durability
+    path = tempfile.mkdtemp(prefix="lea-bench-")
+    storage = BACKENDS[backend](path)
+    copies = [ChatSession(session_id=str(uuid.uuid4()), student_id="bench") for _ in range(sessions)]
+    
+    fsyncs = 0
+    latencies = []
+    for turn in range(turns):
+        for session in copies:
+            session.messages.append(Message(role="user", content=f"Frage {turn}: Wie sagt man das?"))
+            session.messages.append(Message(role="assistant", content="Eine ausführliche Antwort. " * 20))
+            start = time.perf_counter()
+            storage.save_session(session)
+            latencies.append(time.perf_counter() - start)
+        time.sleep(gap)
+    storage.close()
+    
+    reopened = BACKENDS[backend](path)
+    stored = sum(len(reopened.get_session(session.session_id).messages) for session in copies)
+    reopened.close()
+    return {
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "fsyncs": fsyncs if backend != "sqlite" else None,
+        "flushes": storage.flushes,
+        "missing": sessions * turns * 2 - stored,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--gap-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    
+    os.fsync = counting_fsync
+    
+    print("=" * 78)
+    print(f"{'backend':<10} {'durability':<14} {'ack p50 ms':>11} {'ack p99 ms':>11} "
+          f"{'fsyncs':>7} {'flushes':>8} {'missing':>8}")
+    print("-" * 78)
+    for backend in BACKENDS:
+        for durability in ("sync", "strict", "write_behind"):
+            result = run(backend, durability, args.sessions, args.turns, args.gap_ms / 1000)
+            fsync_count = "n/a" if result["fsyncs"] is None else result["fsyncs"]
+            print(f"{backend:<10} {durability:<14} {result['p50']:11.3f} {result['p99']:11.3f} "
+                  f"{fsync_count:>7} {result['flushes']:>8} {result['missing']:>8}")
+    print("=" * 78)
+    print(f"{args.sessions} sessions x {args.turns} turns, {args.gap_ms:.0f} ms between rounds, "
+          f"flush every {settings.session_flush_interval_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
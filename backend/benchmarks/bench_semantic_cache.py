@@ -0,0 +1,124 @@
+"""
+Semantic cache lookup latency and recall at a large index size.
+
+Fills one level/mode index with synthetic learner questions ("What is the
+difference between X and Y?"), then looks up reworded versions of stored
+questions (recall: the stored answer must come back), questions about
+word pairs that were never stored, and near misses of stored questions
+that differ only in a number or a negation (false hits: nothing may come
+back for either).
+Run from the backend folder: python benchmarks/bench_semantic_cache.py --entries 100000
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.services.semantic_cache import SemanticCache  # noqa: E402
+from _stats import percentile  # noqa: E402
+
+SYLLABLES = [
+    "ber", "gen", "lauf", "stadt", "haus", "wort", "zeit", "bahn", "weg", "spiel",
+    "kraft", "land", "schrift", "werk", "arbeit", "frei", "stein", "feld", "tag", "licht",
+    "see", "wald", "kunst", "buch", "brot", "geld", "tisch", "hof", "berg", "ruf",
+]
+
+TEMPLATES = [
+    "What is the difference between {a} and {b}?",
+    "When do I use {a} instead of {b}?",
+    "Can you explain {a} and {b}?",
+]
+
+REWORDINGS = [
+    "{a} vs {b}?",
+    "difference between {b} and {a} please",
+    "explain {a} and {b} to me",
+    "whats the difference {a} {b}",
+]
+
+# (stored question, near miss needing a different answer)
+NEAR_MISSES = [
+    ("Give me {n} practice sentences with {a}", "Give me {m} practice sentences with {a}"),
+    ("Translate: I am {a}", "Translate: I am not {a}"),
+    ("Is {a} a separable verb?", "Isn't {a} a separable verb?"),
+    ("Ich habe {a}", "Ich habe kein {a}"),
+    ("Explain {a} in {n} sentences", "Explain {a} in {m} sentences"),
+]
+
+
+def make_words(count: int, rng: random.Random) -> list:
+    words = {"".join(pair) for pair in itertools.product(SYLLABLES, repeat=2)}
+    words |= {"".join(rng.sample(SYLLABLES, 3)) for _ in range(count)}
+    return sorted(words)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+    
+    rng = random.Random(7)
+    cache = SemanticCache(enabled=True, modes=["grammar_practice"], threshold=args.threshold)
+    if not cache.enabled:
+        sys.exit("NumPy is required for the semantic cache benchmark")
+    cache.max_entries = args.entries
+    
+    # Stored pairs use one half of the vocabulary; unseen pairs use the other half
+    words = make_words(1000, rng)
+    stored_words, unseen_words = words[:500], words[500:]
+    pairs = list(itertools.combinations(stored_words, 2))
+    rng.shuffle(pairs)
+    pairs = pairs[:args.entries]
+    
+    start = time.perf_counter()
+    for i, (a, b) in enumerate(pairs):
+        cache.store("B1", "grammar_practice", TEMPLATES[i % len(TEMPLATES)].format(a=a, b=b), f"answer-{i}")
+    fill_seconds = time.perf_counter() - start
+    
+    latencies = []
+    found = 0
+    for _ in range(args.queries):
+        i = rng.randrange(len(pairs))
+        a, b = pairs[i]
+        question = rng.choice(REWORDINGS).format(a=a, b=b)
+        start = time.perf_counter()
+        answer = cache.lookup("B1", "grammar_practice", question)
+        latencies.append(time.perf_counter() - start)
+        found += answer == f"answer-{i}"
+    
+    false_hits = 0
+    for _ in range(args.queries):
+        a, b = rng.sample(unseen_words, 2)
+        false_hits += cache.lookup("B1", "grammar_practice", rng.choice(REWORDINGS).format(a=a, b=b)) is not None
+    
+    # One word each, and near misses use numbers (10+) no stored question has,
+    # so any hit is an answer to a question with a different number or negation
+    near_misses = []
+    for i, a in enumerate(stored_words[:args.queries]):
+        stored, near_miss = NEAR_MISSES[i % len(NEAR_MISSES)]
+        n = rng.randint(2, 9)
+        cache.store("B1", "grammar_practice", stored.format(a=a, n=n), f"near-{i}")
+        near_misses.append(near_miss.format(a=a, m=n + 10))
+    near_hits = sum(cache.lookup("B1", "grammar_practice", question) is not None for question in near_misses)
+    
+    print("=" * 64)
+    print(f"{len(pairs)} entries, dim {cache.dim}, threshold {cache.threshold}")
+    print(f"  fill             {fill_seconds:8.1f} s ({len(pairs) / fill_seconds:,.0f} inserts/s)")
+    print(f"  lookup p50       {percentile(latencies, 0.50) * 1000:8.2f} ms")
+    print(f"  lookup p99       {percentile(latencies, 0.99) * 1000:8.2f} ms")
+    print(f"  recall           {found / args.queries:8.1%}  (reworded stored questions)")
+    print(f"  false hit rate   {false_hits / args.queries:8.1%}  (questions never stored)")
+    print(f"  near-miss hits   {near_hits / len(near_misses):8.1%}  (other number or negation)")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
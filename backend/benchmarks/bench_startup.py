@@ -0,0 +1,124 @@
+"""
+Backend startup (import) time, from python -X importtime.
+
+Imports main in fresh interpreters with every real provider configured
+(OpenAI primary, Gemini and Groq as fallbacks, dummy keys) and reports the
+median import time of main, the slowest top-level imports, which heavy
+SDKs were loaded at startup, and what the first use of the primary
+provider's client costs. None of the SDKs should load before a provider
+is used. Write the report with --output benchmarks/startup_importtime.txt;
+it is tracked in the repo so regressions show up in diffs. Exits with
+status 1 if an SDK is imported at startup or main exceeds --max-ms.
+Run from the backend folder: python benchmarks/bench_startup.py
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported once a provider (or the semantic cache) needs them
+LAZY_MODULES = ["openai", "google.genai", "groq", "numpy"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+FIRST_USE = """
+import time
+import main
+start = time.perf_counter()
+main.ai_service.client
+print(f"first_use_ms={(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+def run(code: str, env: dict) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def parse(stderr: str) -> dict:
+    """
+    Map each module imported by main to (cumulative microseconds, depth).
+    
+    importtime prints a module after everything it imported, so main's
+    imports are the nested lines just above it (interpreter startup
+    imports such as site come earlier, at depth 0).
+    """
+    lines = [
+        (match.group(4), int(match.group(2)), len(match.group(3)) // 2)
+        for match in map(IMPORTTIME_LINE.match, stderr.splitlines()) if match
+    ]
+    end = next(i for i, (name, _, depth) in enumerate(lines) if name == "main" and depth == 0)
+    start = end
+    while start > 0 and lines[start - 1][2] > 0:
+        start -= 1
+    return {name: (cumulative, depth) for name, cumulative, depth in lines[start:end + 1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    
+    env = {
+        **os.environ,
+        "DATA_DIR": tempfile.mkdtemp(prefix="lea-bench-"),
+        "AI_PROVIDER": "openai",
+        "AI_FALLBACK_PROVIDERS": '["gemini", "groq"]',
+        "OPENAI_API_KEY": "bench",
+        "GEMINI_API_KEY": "bench",
+        "GROQ_API_KEY": "bench",
+    }
+    
+    runs = [parse(run("import main", env).stderr) for _ in range(args.runs)]
+    main_ms = statistics.median(modules["main"][0] for modules in runs) / 1000
+    last = runs[-1]
+    
+    # Imports of main and of the packages they pull in, slowest first
+    top = sorted(
+        ((name, statistics.median(m.get(name, (0, 0))[0] for m in runs) / 1000)
+         for name, (_, depth) in last.items() if depth <= 2 and name != "main"),
+        key=lambda item: item[1], reverse=True
+    )[:args.top]
+    loaded = [name for name in LAZY_MODULES if name in last]
+    
+    first_use = run(FIRST_USE, env).stdout
+    first_use_ms = float(re.search(r"first_use_ms=([\d.]+)", first_use).group(1))
+    
+    lines = [
+        f"import main (median of {args.runs} runs): {main_ms:.0f} ms",
+        f"provider SDKs loaded at startup: {', '.join(loaded) or 'none'}",
+        f"first use of the primary (openai) client: {first_use_ms:.0f} ms",
+        "",
+        "slowest imports (cumulative, ms):",
+        *(f"  {ms:8.1f}  {name}" for name, ms in top),
+    ]
+    report = "\n".join(lines) + "\n"
+    print("=" * 64)
+    print(report, end="")
+    print("=" * 64)
+    
+    if args.output:
+        args.output.write_text(
+            f"# Generated by: python benchmarks/bench_startup.py --output {args.output.as_posix()}\n"
+            f"# Python {sys.version.split()[0]}, {sys.platform}\n" + report,
+            encoding="utf-8"
+        )
+    
+    if loaded or (args.max_ms is not None and main_ms > args.max_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
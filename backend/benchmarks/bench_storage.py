@@ -0,0 +1,120 @@
+"""
+Storage backend benchmark.
+
+Compares the JSON (whole-file and append-log modes) and SQLite backends on
+profile lookup by email, appending chat turns and listing a student's sessions.
+Run from the backend folder: python benchmarks/bench_storage.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Keep the module-level storage singleton away from the real data folder
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lea-bench-"))
+
+from src.models.schemas import StudentProfile, ChatSession, Message  # noqa: E402
+from src.services.storage_service import JSONStorageService  # noqa: E402
+from src.services.sqlite_storage_service import SQLiteStorageService  # noqa: E402
+
+
+def make_backends(root: Path):
+    """Create one fresh instance of every backend under a temporary root."""
+    return {
+        "json": JSONStorageService(data_dir=str(root / "json"), session_storage_mode="json"),
+        "json-log": JSONStorageService(data_dir=str(root / "json-log"), session_storage_mode="log"),
+        "sqlite": SQLiteStorageService(db_path=str(root / "sqlite" / "lea.db")),
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    """Return the mean wall time of fn() in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def bench_profile_lookup(storage, profiles: int, repeat: int) -> float:
+    emails = []
+    for i in range(profiles):
+        email = f"student{i}@example.com"
+        storage.save_profile(StudentProfile(
+            student_id=str(uuid.uuid4()),
+            name=f"Student {i}",
+            email=email,
+            current_level="A2",
+        ))
+        emails.append(email)
+    
+    target = emails[len(emails) // 2]
+    return timed(lambda: storage.get_profile_by_email(target), repeat)
+
+
+def bench_session_append(storage, turns: int) -> float:
+    session = ChatSession(session_id=str(uuid.uuid4()), student_id="append-student")
+    
+    start = time.perf_counter()
+    for i in range(turns):
+        session.messages.append(Message(role="user", content=f"Frage {i}: Wie sagt man das?"))
+        session.messages.append(Message(role="assistant", content="Eine ausführliche Antwort. " * 20))
+        storage.save_session(session)
+    return (time.perf_counter() - start) * 1000 / turns
+
+
+def bench_session_listing(storage, students: int, sessions_per_student: int, repeat: int) -> float:
+    student_ids = [str(uuid.uuid4()) for _ in range(students)]
+    for student_id in student_ids:
+        for _ in range(sessions_per_student):
+            session = ChatSession(session_id=str(uuid.uuid4()), student_id=student_id)
+            session.messages = [
+                Message(role="user", content="Hallo Lea!"),
+                Message(role="assistant", content="Hallo! Wie kann ich helfen?"),
+            ]
+            storage.save_session(session)
+    
+    target = student_ids[0]
+    return timed(lambda: storage.get_student_sessions(target), repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--sessions-per-student", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory(prefix="lea-bench-") as tmp:
+        backends = make_backends(Path(tmp))
+        
+        print("=" * 72)
+        print(f"{'backend':<10} {'profile lookup':>18} {'session append':>18} {'session listing':>18}")
+        print(f"{'':<10} {'(ms/lookup)':>18} {'(ms/turn)':>18} {'(ms/listing)':>18}")
+        print("-" * 72)
+        
+        for name, storage in backends.items():
+            lookup = bench_profile_lookup(storage, args.profiles, args.repeat)
+            append = bench_session_append(storage, args.turns)
+            listing = bench_session_listing(
+                storage, args.students, args.sessions_per_student, args.repeat
+            )
+            print(f"{name:<10} {lookup:>18.3f} {append:>18.3f} {listing:>18.3f}")
+        
+        print("=" * 72)
+        print(
+            f"profiles={args.profiles} turns={args.turns} "
+            f"students={args.students} sessions/student={args.sessions_per_student}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Storage codec throughput and size.
+
+Encodes and decodes chat sessions of --sizes messages (German text with
+umlauts) the way the JSON backend used to (indented json module output,
+json.loads and ChatSession(**data)) and with the storage codec (compact,
+orjson when installed, validated once with model_validate). For reference
+it also times an unvalidated load that builds the models with
+model_construct, which only pays off if it beats pydantic-core validation.
+Run from the backend folder: python benchmarks/bench_storage_codec.py
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.config.settings import settings  # noqa: E402
+from src.models.schemas import ChatSession, Message  # noqa: E402
+from src.services import storage_codec  # noqa: E402
+
+
+def make_session(size: int) -> ChatSession:
+    session = ChatSession(session_id="bench", student_id="bench", teaching_mode="grammar_practice")
+    for i in range(size):
+        session.messages.append(Message(role="user", content=f"Frage {i}: Wann benutzt man „dass“ statt „das“?"))
+        session.messages.append(Message(
+            role="assistant", content="„Dass“ leitet einen Nebensatz ein, „das“ ist Artikel oder Pronomen. " * 8
+        ))
+    session.messages = session.messages[:size]
+    return session
+
+
+def json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def construct(data: dict) -> ChatSession:
+    """Build the models without validation; datetimes still need parsing."""
+    parse = datetime.fromisoformat
+    messages = [
+        Message.model_construct(**{**message, "timestamp": parse(message["timestamp"])})
+        for message in data["messages"]
+    ]
+    return ChatSession.model_construct(**{
+        **data,
+        "messages": messages,
+        "created_at": parse(data["created_at"]),
+        "updated_at": parse(data["updated_at"]),
+    })
+
+
+def timed(fn, min_seconds: float = 0.2) -> float:
+    """Mean wall time of fn() in milliseconds, repeated for at least min_seconds."""
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    
+    settings.storage_codec = "compact"
+    codec = "orjson" if storage_codec.orjson is not None else "json module"
+    
+    print("=" * 86)
+    print(f"{'messages':>8} {'format':<18} {'bytes':>10} {'encode ms':>10} {'decode ms':>10} "
+          f"{'msgs/s in':>12} {'msgs/s out':>12}")
+    print("-" * 86)
+    for size in args.sizes:
+        session = make_session(size)
+        old = json.dumps(session.model_dump(), indent=2, default=json_default).encode("utf-8")
+        new = storage_codec.encode(session.model_dump(), document=True)
+        assert ChatSession.model_validate(storage_codec.decode(new)) == session
+        assert construct(storage_codec.decode(new)) == session
+        
+        rows = [
+            ("indented json", old,
+             lambda: json.dumps(session.model_dump(), indent=2, default=json_default).encode("utf-8"),
+             lambda: ChatSession(**json.loads(old))),
+            (f"compact ({codec})", new,
+             lambda: storage_codec.encode(session.model_dump(), document=True),
+             lambda: ChatSession.model_validate(storage_codec.decode(new))),
+            ("model_construct", new,
+             None,
+             lambda: construct(storage_codec.decode(new))),
+        ]
+        for name, raw, encode, decode in rows:
+            encode_ms = timed(encode) if encode else None
+            decode_ms = timed(decode)
+            print(f"{size:>8} {name:<18} {len(raw):>10} "
+                  f"{'' if encode_ms is None else f'{encode_ms:.3f}':>10} {decode_ms:>10.3f} "
+                  f"{'' if encode_ms is None else f'{size / encode_ms * 1000:,.0f}':>12} "
+                  f"{size / decode_ms * 1000:>12,.0f}")
+        print("-" * 86)
+    print("bytes: one whole-file session; decode includes building the ChatSession")
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
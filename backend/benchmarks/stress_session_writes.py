@@ -0,0 +1,177 @@
+"""
+Concurrent chat turns on shared sessions from several worker processes.
+
+Starts --workers processes (like uvicorn workers sharing one data folder),
+each running --writers concurrent tasks that send --turns messages to a
+handful of shared sessions through the chat controller and the mock
+provider in echo mode. Afterwards every session is checked: each successful
+turn must be stored exactly once, as a user message directly followed by
+its own reply. Turns rejected with a version conflict are reported, never
+lost. A second phase sends turns on distinct sessions at once to confirm
+they still run in parallel. Exits with status 1 if any turn was lost.
+Run from the backend folder: python benchmarks/stress_session_writes.py --backend sqlite
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+STUDENT_ID = "stress-student"
+
+
+async def run_worker(worker: int, session_ids: list, writers: int, turns: int) -> dict:
+    from src.controllers.chat_controller import chat_controller
+    from src.models.schemas import ChatRequest
+    from src.services.storage_service import SessionConflictError
+    
+    rng = random.Random(worker)
+    outcome = Counter()
+    
+    async def writer(index: int) -> None:
+        for turn in range(turns):
+            request = ChatRequest(
+                student_id=STUDENT_ID,
+                session_id=rng.choice(session_ids),
+                message=f"w{worker}-{index}-{turn}"
+            )
+            try:
+                await chat_controller.send_message(request)
+                outcome["ok"] += 1
+            except SessionConflictError:
+                outcome["conflict"] += 1
+    
+    await asyncio.gather(*(writer(i) for i in range(writers)))
+    return dict(outcome)
+
+
+def seed(sessions: int) -> list:
+    from src.models.schemas import ChatSession, StudentProfile
+    from src.services.storage_service import storage_service
+    
+    storage_service.save_profile(StudentProfile(
+        student_id=STUDENT_ID, name="Stress", email="stress@example.com", current_level="B1"
+    ))
+    session_ids = []
+    for _ in range(sessions):
+        session = ChatSession(session_id=str(uuid.uuid4()), student_id=STUDENT_ID)
+        storage_service.save_session(session)
+        session_ids.append(session.session_id)
+    return session_ids
+
+
+def verify(session_ids: list) -> tuple:
+    """Return (stored turns, malformed sessions)."""
+    from src.services.storage_service import storage_service
+    
+    stored, malformed = 0, 0
+    for session_id in session_ids:
+        messages = storage_service.get_session(session_id).messages
+        pairs = list(zip(messages[::2], messages[1::2]))
+        if len(messages) % 2 or any(
+            user.role != "user" or reply.content != f"Echo: {user.content}" for user, reply in pairs
+        ):
+            malformed += 1
+        stored += len(pairs)
+    return stored, malformed
+
+
+async def parallel_turns(count: int) -> float:
+    """Seconds for count concurrent turns, each on its own new session."""
+    from src.controllers.chat_controller import chat_controller
+    from src.models.schemas import ChatRequest
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        chat_controller.send_message(ChatRequest(student_id=STUDENT_ID, message=f"parallel-{i}"))
+        for i in range(count)
+    ))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--session-storage-mode", choices=["json", "log"], default="log")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--session-ids", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker is not None:
+        outcome = asyncio.run(run_worker(args.worker, args.session_ids.split(","), args.writers, args.turns))
+        print(json.dumps(outcome))
+        return
+    
+    os.environ.update({
+        "DATA_DIR": tempfile.mkdtemp(prefix="lea-stress-"),
+        "STORAGE_BACKEND": args.backend,
+        "SESSION_STORAGE_MODE": args.session_storage_mode,
+        "AI_PROVIDER": "mock",
+        "MOCK_RESPONSE_MODE": "echo",
+        "MOCK_LATENCY_MS": str(args.latency_ms),
+        "MOCK_LATENCY_JITTER_MS": str(args.latency_ms / 2),
+        "MOCK_TOKENS_PER_SECOND": "100000",
+    })
+    os.environ["SQLITE_PATH"] = os.path.join(os.environ["DATA_DIR"], "lea.db")
+    
+    session_ids = seed(args.sessions)
+    
+    start = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable, __file__, "--worker", str(worker),
+                "--session-ids", ",".join(session_ids),
+                "--writers", str(args.writers), "--turns", str(args.turns),
+            ],
+            stdout=subprocess.PIPE, text=True
+        )
+        for worker in range(args.workers)
+    ]
+    outcome = Counter()
+    for worker in workers:
+        stdout, _ = worker.communicate()
+        outcome.update(json.loads(stdout.strip().splitlines()[-1]))
+    elapsed = time.perf_counter() - start
+    
+    stored, malformed = verify(session_ids)
+    lost = outcome["ok"] - stored
+    
+    parallel = max(64, args.writers)
+    parallel_seconds = asyncio.run(parallel_turns(parallel))
+    
+    print("=" * 64)
+    print(f"{args.backend} storage ({args.session_storage_mode}), {args.workers} workers x "
+          f"{args.writers} writers x {args.turns} turns on {args.sessions} sessions")
+    print(f"  elapsed            {elapsed:8.1f} s")
+    print(f"  turns saved        {outcome['ok']:8d}")
+    print(f"  turns rejected     {outcome['conflict']:8d}  (version conflict after retries)")
+    print(f"  turns stored       {stored:8d}")
+    print(f"  lost turns         {lost:8d}")
+    print(f"  malformed sessions {malformed:8d}")
+    print(f"  {parallel} turns on distinct sessions: {parallel_seconds * 1000:.0f} ms "
+          f"(mock latency {args.latency_ms:.0f} ms per turn)")
+    print("=" * 64)
+    
+    if lost or malformed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
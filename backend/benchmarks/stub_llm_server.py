@@ -0,0 +1,156 @@
+"""
+Local stub LLM server for load tests.
+
+Serves OpenAI-compatible chat completions (also under Groq's /openai/v1
+prefix) and Gemini generateContent, blocking or streamed as SSE, with a
+configurable latency and token rate, so AIService can be benchmarked without
+network access or API costs. --slow-rate adds a latency tail, --fail-rate answers
+a fraction of requests with 503 to exercise failover and hedging, and
+--rate-limit-rate answers with 429 and a Retry-After header.
+Run from the backend folder: python benchmarks/stub_llm_server.py --port 9100
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import json
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Stub LLM server")
+app.state.latency_ms = 500.0
+app.state.jitter_ms = 0.0
+app.state.tokens_per_second = 50.0
+app.state.slow_rate = 0.0
+app.state.slow_ms = 0.0
+app.state.fail_rate = 0.0
+app.state.rate_limit_rate = 0.0
+app.state.retry_after = 1.0
+
+REPLY = "Gern! Hier ist eine kurze Erklärung mit Beispielen auf Deutsch und Englisch."
+
+
+async def simulate_latency() -> None:
+    if random.random() < app.state.rate_limit_rate:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit reached",
+            headers={"Retry-After": f"{app.state.retry_after:g}"}
+        )
+    if random.random() < app.state.fail_rate:
+        raise HTTPException(status_code=503, detail="Stub overloaded")
+    jitter = random.uniform(-app.state.jitter_ms, app.state.jitter_ms)
+    latency = app.state.latency_ms + jitter
+    if random.random() < app.state.slow_rate:
+        latency += app.state.slow_ms
+    await asyncio.sleep(max(0.0, latency) / 1000)
+
+
+async def stream_tokens():
+    """Yield the reply word by word at the configured token rate."""
+    words = REPLY.split(" ")
+    for i, word in enumerate(words):
+        yield word if i == 0 else " " + word
+        await asyncio.sleep(1 / app.state.tokens_per_second)
+
+
+def sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await simulate_latency()
+    
+    if body.get("stream"):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        
+        async def chunks():
+            async for token in stream_tokens():
+                yield sse({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                })
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+    
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": REPLY},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1beta/models/{model}:generateContent")
+async def generate_content(model: str):
+    await simulate_latency()
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": REPLY}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+    }
+
+
+@app.post("/v1beta/models/{model}:streamGenerateContent")
+async def stream_generate_content(model: str):
+    await simulate_latency()
+    
+    async def chunks():
+        async for token in stream_tokens():
+            yield sse({
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": token}]},
+                    "index": 0,
+                }],
+            })
+    
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    args = parser.parse_args()
+    
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    app.state.tokens_per_second = args.tokens_per_second
+    app.state.slow_rate = args.slow_rate
+    app.state.slow_ms = args.slow_ms
+    app.state.fail_rate = args.fail_rate
+    app.state.rate_limit_rate = args.rate_limit_rate
+    app.state.retry_after = args.retry_after
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.config.settings import settings
 from src.routes import chat_routes, student_routes, auth_routes
+from src.services.storage_service import storage_service
+from src.services.context_builder import context_builder
+from src.services.ai_service import ai_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write-behind sessions must reach storage before the worker exits
+    await asyncio.get_running_loop().run_in_executor(None, storage_service.close)
+
 
 app = FastAPI(
     title="GermanLeap Lea AI Tutor API",
     description="Backend API for GermanLeap's AI-powered German language tutor",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -43,6 +57,19 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for capacity tuning."""
+    return {
+        "storage_cache": storage_service.cache_stats(),
+        "persistence": storage_service.persistence_stats(),
+        "context": context_builder.stats(),
+        "response_cache": ai_service.response_cache.stats(),
+        "semantic_cache": ai_service.semantic_cache.stats(),
+        "ai_providers": ai_service.provider_stats()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
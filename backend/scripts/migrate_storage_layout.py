@@ -0,0 +1,69 @@
+"""
+Move JSON storage files into the layout set by STORAGE_LAYOUT, online.
+
+Run it after every worker has been restarted with the new STORAGE_LAYOUT.
+Workers keep serving meanwhile: they read records from whichever layout
+holds them and move a record over themselves before writing it. This tool
+moves the rest, one record at a time under the same lock as the workers, so
+it never races a worker's save. It can be stopped and run again at any
+time. Once nothing is left in the old layout it removes emptied shard
+directories and marks the email and session indexes current, so workers
+do not rebuild them at their next start.
+Run from the backend folder: python scripts/migrate_storage_layout.py --layout sharded
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from src.config.settings import settings  # noqa: E402
+from src.services.storage_service import JSONStorageService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data-dir", default=settings.data_dir)
+    parser.add_argument("--layout", choices=["flat", "sharded"], default=settings.storage_layout)
+    parser.add_argument("--batch", type=int, default=1000, help="records moved between pauses")
+    parser.add_argument("--pause-ms", type=float, default=50.0, help="pause between batches, to spare the disk")
+    parser.add_argument("--dry-run", action="store_true", help="only count the records to move")
+    args = parser.parse_args()
+    
+    storage = JSONStorageService(data_dir=args.data_dir, layout=args.layout)
+    print(f"Migrating {args.data_dir} from the {storage.other_layout} to the {storage.layout} layout")
+    
+    start = time.perf_counter()
+    for kind in ("profiles", "sessions"):
+        moved = 0
+        for key in storage.iter_unmigrated(kind):
+            if args.dry_run:
+                moved += 1
+                continue
+            # False when a worker moved the record first
+            if not storage.migrate_record(kind, key):
+                continue
+            moved += 1
+            if moved % args.batch == 0:
+                print(f"  {kind}: {moved} moved")
+                time.sleep(args.pause_ms / 1000)
+        print(f"  {kind}: {moved} {'to move' if args.dry_run else 'moved in total'}")
+    
+    if args.dry_run:
+        return
+    
+    left = sum(1 for kind in ("profiles", "sessions") for _ in storage.iter_unmigrated(kind))
+    if left:
+        print(f"{left} records appeared in the {storage.other_layout} layout meanwhile; run again "
+              f"once every worker uses STORAGE_LAYOUT={storage.layout}")
+        sys.exit(1)
+    
+    storage.finish_layout_migration()
+    print(f"Done in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Literal
+from typing import List, Literal
 
 
 class Settings(BaseSettings):
@@ -10,25 +10,124 @@ class Settings(BaseSettings):
     environment: str = "development"
     
     # AI Provider
-    ai_provider: Literal["openai", "gemini", "groq"] = "groq"
+    ai_provider: Literal["openai", "gemini", "groq", "mock"] = "groq"
+    # Tried in order when the primary provider fails or times out
+    ai_fallback_providers: List[Literal["openai", "gemini", "groq", "mock"]] = []
+    # Hedging: if the current provider has not answered within its recent
+    # latency percentile, also ask the next provider and use the first answer
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20  # Latencies needed before the percentile is trusted
+    hedge_default_delay_ms: float = 3000.0  # Used until then
+    # Provider request queue (limits are per provider, see <provider>_requests_per_minute)
+    provider_queue_timeout_seconds: float = 30.0  # Longest wait for a slot before a 503
+    rate_limit_max_retries: int = 3  # Retries of a 429 / Retry-After response
+    rate_limit_backoff_seconds: float = 1.0  # Base backoff when no Retry-After is sent
+    rate_limit_jitter: float = 0.5  # Delays are stretched by up to this fraction
     
     # OpenAI
     openai_api_key: str = ""
     openai_model: str = "gpt-4-turbo-preview"
+    openai_base_url: str = ""  # Empty uses the SDK default
+    openai_timeout_seconds: float = 30.0
+    openai_requests_per_minute: int = 0  # 0 = no limit
+    openai_tokens_per_minute: int = 0
+    openai_max_concurrency: int = 64
     
     # Google Gemini
     gemini_api_key: str = ""
     gemini_model: str = "gemini-1.5-pro"
+    gemini_base_url: str = ""
+    gemini_timeout_seconds: float = 30.0
+    gemini_requests_per_minute: int = 0  # 0 = no limit
+    gemini_tokens_per_minute: int = 0
+    gemini_max_concurrency: int = 64
     
     # Groq
     groq_api_key: str = ""
     groq_model: str = "llama-3.1-70b-versatile"
+    groq_base_url: str = ""
+    groq_timeout_seconds: float = 30.0
+    groq_requests_per_minute: int = 0  # 0 = no limit
+    groq_tokens_per_minute: int = 0
+    groq_max_concurrency: int = 64
+    
+    # Password hashing
+    bcrypt_rounds: int = 12  # Each +1 doubles the cost of a hash
+    password_hash_workers: int = 0  # Threads for bcrypt; 0 = one per CPU core
+    password_hash_max_concurrency: int = 32  # Hashes admitted to the pool at once
+    
+    # Session tokens (HMAC-signed); set TOKEN_SECRET to share tokens across workers
+    token_secret: str = ""
+    access_token_ttl_seconds: int = 3600
+    refresh_token_ttl_seconds: int = 30 * 24 * 3600
+    
+    # Finished idempotent chat turns kept to answer retries of the same request
+    idempotency_ttl_seconds: float = 600.0
+    idempotency_max_entries: int = 10000
+    
+    # Prompt context window (estimated tokens); older turns are summarized
+    context_token_budget: int = 3000
+    context_summary_max_tokens: int = 400
+    
+    # Response cache for repeatable prompts (opt-in). Only standalone turns in
+    # the listed teaching modes are cached, keyed on prompt, mode, level and message.
+    response_cache_enabled: bool = False
+    response_cache_modes: List[str] = ["exam_preparation", "vocabulary_building", "grammar_practice"]
+    response_cache_size: int = 2048  # Entries kept in memory
+    response_cache_ttl_seconds: float = 7 * 24 * 3600
+    response_cache_disk_max_entries: int = 50000
+    
+    # Semantic cache (opt-in, needs NumPy): reuses the answer to a similar
+    # standalone question asked earlier at the same level and teaching mode
+    semantic_cache_enabled: bool = False
+    semantic_cache_modes: List[str] = ["exam_preparation", "vocabulary_building", "grammar_practice"]
+    semantic_cache_threshold: float = 0.8  # Cosine similarity needed for a hit
+    semantic_cache_dim: int = 256  # Hashed n-gram buckets (4 bytes each per entry)
+    semantic_cache_max_entries: int = 50000  # Per level and mode; oldest replaced first
+    
+    # Mock provider (offline load testing, no API key needed)
+    mock_latency_ms: float = 800.0  # Mean time to first token
+    mock_latency_jitter_ms: float = 300.0  # Spread (std dev / half-range)
+    mock_latency_distribution: Literal["fixed", "uniform", "normal", "lognormal"] = "lognormal"
+    mock_tokens_per_second: float = 40.0
+    mock_response_mode: Literal["canned", "echo"] = "canned"
+    mock_seed: int = 42
+    mock_timeout_seconds: float = 30.0
+    mock_requests_per_minute: int = 0
+    mock_tokens_per_minute: int = 0
+    mock_max_concurrency: int = 64
     
     # CORS
     cors_origin: str = "http://localhost:8501"
     
     # Data Storage
+    storage_backend: Literal["json", "sqlite"] = "json"
     data_dir: str = "./data"
+    sqlite_path: str = "./data/lea.db"
+    # "json" rewrites the whole session per turn; "log" appends to a JSONL log
+    session_storage_mode: Literal["json", "log"] = "json"
+    # "sharded" stores JSON profiles and sessions as <dir>/ab/cd/<id>.json
+    # (md5 of the id) to keep directories small; "flat" as <dir>/<id>.json.
+    # Move existing files with scripts/migrate_storage_layout.py
+    storage_layout: Literal["flat", "sharded"] = "flat"
+    # Compact a session log after this many appended turns
+    session_log_compact_threshold: int = 50
+    # In-process LRU cache for profiles and sessions (0 disables it)
+    storage_cache_size: int = 1024
+    storage_cache_ttl_seconds: float = 300.0
+    # "compact" stores profiles and sessions as compact JSON (encoded by
+    # orjson when installed), "pretty" as indented JSON; both are read back
+    storage_codec: Literal["compact", "pretty"] = "compact"
+    # When a chat turn counts as saved: "sync" writes it before replying,
+    # "strict" also fsyncs it, "write_behind" replies after an in-memory
+    # commit and a background writer persists it (one fsynced write per
+    # session per flush, batching all turns since the last flush)
+    session_durability: Literal["sync", "strict", "write_behind"] = "sync"
+    session_flush_interval_ms: float = 200.0
+    # Threads used by the async storage API for blocking file/database I/O.
+    # Parsing holds the GIL, so more threads mean longer event loop hand-offs.
+    storage_io_workers: int = 4
     
     model_config = SettingsConfigDict(
         env_file='.env',
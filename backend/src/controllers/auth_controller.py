@@ -1,61 +1,93 @@
 """Authentication controller for handling signup and login."""
+import asyncio
 import uuid
-from passlib.context import CryptContext
-from src.models.schemas import SignupRequest, LoginRequest, StudentProfile, AuthResponse
-from src.services.storage_service import storage_service
-
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import weakref
+from src.config.settings import settings
+from src.models.schemas import SignupRequest, LoginRequest, RefreshRequest, StudentProfile, AuthResponse
+from src.services.storage_service import EmailTakenError, storage_service
+from src.services.password_hasher import password_hasher
+from src.services.token_service import InvalidTokenError, token_service
 
 
 class AuthController:
-    """Controller for authentication operations."""
+    """
+    Controller for authentication operations.
+    
+    Signups for the same email wait for each other within this worker, so
+    the second one sees the first account. Across workers the storage
+    backend rejects the duplicate when saving (EmailTakenError).
+    """
     
-    def hash_password(self, password: str) -> str:
-        """Hash a password."""
-        return pwd_context.hash(password)
+    def __init__(self):
+        # Entries disappear once no signup holds or waits for the lock
+        self._signup_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+    async def hash_password(self, password: str) -> str:
+        """Hash a password on the password hashing pool."""
+        return await password_hasher.hash(password)
     
-    def signup(self, request: SignupRequest) -> AuthResponse:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the password hashing pool."""
+        return await password_hasher.verify(plain_password, hashed_password)
+    
+    def _issue_tokens(self, student_id: str) -> dict:
+        """Issue a fresh access/refresh token pair for a student."""
+        return {
+            "access_token": token_service.issue(student_id, "access"),
+            "refresh_token": token_service.issue(student_id, "refresh"),
+            "expires_in": settings.access_token_ttl_seconds
+        }
+    
+    async def signup(self, request: SignupRequest) -> AuthResponse:
         """Register a new user."""
-        # Check if email already exists
-        existing_profile = storage_service.get_profile_by_email(request.email)
-        if existing_profile:
-            return AuthResponse(
-                success=False,
-                message="An account with this email already exists. Please login instead.",
-                profile=None
-            )
+        email = request.email.lower()
+        lock = self._signup_locks.get(email)
+        if lock is None:
+            lock = self._signup_locks[email] = asyncio.Lock()
         
-        # Create new profile with hashed password
-        profile = StudentProfile(
-            student_id=str(uuid.uuid4()),
-            name=request.name,
-            email=request.email,
-            password_hash=self.hash_password(request.password),
-            current_level=request.current_level,
-            goals=request.goals,
-            target_exam=request.target_exam,
-            career_interest=request.career_interest
-        )
-        
-        storage_service.save_profile(profile)
+        async with lock:
+            # Check if email already exists
+            existing_profile = await storage_service.aget_profile_by_email(request.email)
+            if existing_profile:
+                return self._email_taken()
+            
+            # Create new profile with hashed password
+            profile = StudentProfile(
+                student_id=str(uuid.uuid4()),
+                name=request.name,
+                email=request.email,
+                password_hash=await self.hash_password(request.password),
+                current_level=request.current_level,
+                goals=request.goals,
+                target_exam=request.target_exam,
+                career_interest=request.career_interest
+            )
+            
+            try:
+                await storage_service.asave_profile(profile)
+            except EmailTakenError:
+                # Another worker registered the email meanwhile
+                return self._email_taken()
         
         # Return profile without password_hash for security
         return AuthResponse(
             success=True,
             message="Account created successfully!",
-            profile=profile
+            profile=profile,
+            **self._issue_tokens(profile.student_id)
         )
     
-    def login(self, request: LoginRequest) -> AuthResponse:
+    def _email_taken(self) -> AuthResponse:
+        return AuthResponse(
+            success=False,
+            message="An account with this email already exists. Please login instead.",
+            profile=None
+        )
+    
+    async def login(self, request: LoginRequest) -> AuthResponse:
         """Authenticate a user."""
         # Find profile by email
-        profile = storage_service.get_profile_by_email(request.email)
+        profile = await storage_service.aget_profile_by_email(request.email)
         
         if not profile:
             return AuthResponse(
@@ -73,7 +105,7 @@ class AuthController:
             )
         
         # Verify password
-        if not self.verify_password(request.password, profile.password_hash):
+        if not await self.verify_password(request.password, profile.password_hash):
             return AuthResponse(
                 success=False,
                 message="Incorrect password. Please try again.",
@@ -83,7 +115,26 @@ class AuthController:
         return AuthResponse(
             success=True,
             message="Login successful!",
-            profile=profile
+            profile=profile,
+            **self._issue_tokens(profile.student_id)
+        )
+    
+    async def refresh(self, request: RefreshRequest) -> AuthResponse:
+        """Exchange a valid refresh token for a new token pair (no storage access)."""
+        try:
+            claims = token_service.verify(request.refresh_token, "refresh")
+        except InvalidTokenError as e:
+            return AuthResponse(
+                success=False,
+                message=f"{str(e)}. Please login again.",
+                profile=None
+            )
+        
+        return AuthResponse(
+            success=True,
+            message="Token refreshed.",
+            profile=None,
+            **self._issue_tokens(claims["sub"])
         )
 
 
@@ -1,26 +1,148 @@
+import asyncio
+import base64
+import json
 import uuid
+import weakref
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
-from src.models.schemas import ChatRequest, ChatResponse, ChatSession, Message
-from src.services.storage_service import storage_service
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from src.config.settings import settings
+from src.models.schemas import (
+    ChatRequest, ChatResponse, ChatSession, Message, MessagePage, SessionSummaryPage, StudentProfile
+)
+from src.services.storage_service import SessionConflictError, storage_service
 from src.services.ai_service import ai_service
+from src.services.context_builder import ContextWindow
+from src.services.lru_cache import LRUCache
+
+
+# Times a turn is re-applied to a session another worker saved meanwhile
+SAVE_ATTEMPTS = 5
+
+
+class IdempotencyKeyReused(Exception):
+    """An idempotency key was sent again with a different message."""
+
+
+def _replay_events(response: ChatResponse) -> List[Tuple[str, dict]]:
+    """Stream events equivalent to a finished turn, for requests that joined it."""
+    return [
+        ("session", {"session_id": response.session_id}),
+        ("token", {"delta": response.message}),
+        ("done", response.model_dump(mode="json")),
+    ]
+
+
+def _encode_cursor(updated_at: datetime, session_id: str) -> str:
+    raw = json.dumps([updated_at.isoformat(), session_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        updated_at, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(updated_at), session_id
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class _Flight:
+    """
+    One idempotent chat turn in progress, shared by every request with its key.
+    
+    The turn runs in its own task, so it completes (and is stored) even if
+    the client that started it disconnects. Stream events are buffered so a
+    request that joins late replays them from the start.
+    """
+    
+    def __init__(self, fingerprint: tuple):
+        self.fingerprint = fingerprint
+        self.events: List[Tuple[str, dict]] = []
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._changed = asyncio.Event()
+        # Nobody may be waiting when the turn fails; don't warn about it
+        self.result.add_done_callback(lambda f: f.cancelled() or f.exception())
+    
+    def publish(self, event: str, data: dict) -> None:
+        self.events.append((event, data))
+        self._changed.set()
+    
+    def finish(self, response: Optional[ChatResponse] = None, error: Optional[BaseException] = None) -> None:
+        if error is not None:
+            self.result.set_exception(error)
+        else:
+            if not self.events:
+                self.events.extend(_replay_events(response))
+            self.result.set_result(response)
+        self._changed.set()
+    
+    async def replay(self) -> AsyncIterator[Tuple[str, dict]]:
+        position = 0
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.result.done():
+                break
+            self._changed.clear()
+            await self._changed.wait()
+        
+        if self.result.exception() is not None:
+            raise self.result.exception()
 
 
 class ChatController:
-    """Controller for chat-related operations."""
+    """
+    Controller for chat-related operations.
     
-    async def send_message(self, request: ChatRequest) -> ChatResponse:
-        """Process a chat message and get AI response."""
+    Requests carrying an idempotency_key are single-flight per student and
+    key: a duplicate that arrives while the turn is running joins it, and one
+    that arrives later gets the stored ChatResponse (kept for
+    settings.idempotency_ttl_seconds) without calling the provider again.
+    
+    Turns on the same session are serialized within this worker by a
+    per-session lock held from loading the session until it is saved. Across
+    workers the session version catches concurrent saves; the losing turn is
+    re-applied on top of the newer session instead of overwriting it.
+    """
+    
+    def __init__(self):
+        # Entries disappear once no turn holds or waits for the lock
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        # The event loop only keeps weak references to tasks; running flights live here
+        self._flight_tasks: Set[asyncio.Task] = set()
+        self._results = LRUCache(
+            max_size=settings.idempotency_max_entries,
+            ttl_seconds=settings.idempotency_ttl_seconds
+        )
+    
+    @asynccontextmanager
+    async def _session_turn(self, session_id: Optional[str]) -> AsyncIterator[None]:
+        """Serialize turns on one session; new sessions need no lock."""
+        if not session_id:
+            yield
+            return
+        
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        async with lock:
+            yield
+    
+    async def _start_turn(self, request: ChatRequest) -> Tuple[StudentProfile, ChatSession]:
+        """Load the profile and session for a turn and append the user message."""
         
         # Get student profile
-        profile = storage_service.get_profile(request.student_id)
+        profile = await storage_service.aget_profile(request.student_id)
         if not profile:
             raise ValueError(f"Student profile not found: {request.student_id}")
         
         # Get or create session
         if request.session_id:
-            session = storage_service.get_session(request.session_id)
-            if not session:
+            session = await storage_service.aget_session(request.session_id)
+            # Another student's session is reported as missing, not forbidden
+            if not session or session.student_id != request.student_id:
                 raise ValueError(f"Session not found: {request.session_id}")
         else:
             session = ChatSession(
@@ -33,37 +155,229 @@ class ChatController:
         user_message = Message(role="user", content=request.message)
         session.messages.append(user_message)
         
-        # Get AI response
-        ai_response_content = await ai_service.get_response(
-            profile=profile,
-            messages=session.messages,
-            teaching_mode=request.teaching_mode or session.teaching_mode
-        )
+        return profile, session
+    
+    async def _finish_turn(
+        self,
+        request: ChatRequest,
+        session: ChatSession,
+        ai_response_content: str,
+        context: ContextWindow,
+        provider: Optional[str] = None
+    ) -> ChatResponse:
+        """Append the AI response, persist the session and build the response."""
         
-        # Add AI response to session
-        ai_message = Message(role="assistant", content=ai_response_content)
+        # Add AI response to session, recording the prompt size it cost
+        ai_message = Message(
+            role="assistant",
+            content=ai_response_content,
+            prompt_tokens=context.prompt_tokens
+        )
         session.messages.append(ai_message)
         
         # Update teaching mode if specified
         if request.teaching_mode:
             session.teaching_mode = request.teaching_mode
         
-        # Save session
-        storage_service.save_session(session)
+        # Save session; if another worker saved it first, add this turn to its copy
+        turn = session.messages[-2:]
+        for attempt in range(SAVE_ATTEMPTS):
+            try:
+                await storage_service.asave_session(session)
+                break
+            except SessionConflictError:
+                if attempt == SAVE_ATTEMPTS - 1:
+                    raise
+                session = await storage_service.aget_session(session.session_id)
+                session.messages.extend(turn)
+                if request.teaching_mode:
+                    session.teaching_mode = request.teaching_mode
         
         return ChatResponse(
             session_id=session.session_id,
             message=ai_response_content,
-            timestamp=ai_message.timestamp
+            timestamp=ai_message.timestamp,
+            provider=provider
         )
     
-    def get_session_history(self, session_id: str) -> Optional[ChatSession]:
+    def _fingerprint(self, request: ChatRequest) -> tuple:
+        return (request.session_id, request.message, request.teaching_mode)
+    
+    def _lookup(self, request: ChatRequest) -> Tuple[Optional[ChatResponse], Optional[_Flight]]:
+        """Find a stored result or in-flight turn for the request's idempotency key."""
+        key = (request.student_id, request.idempotency_key)
+        entry = self._results.get(key)
+        flight = self._flights.get(key)
+        
+        fingerprint = entry[0] if entry else flight.fingerprint if flight else None
+        if fingerprint is not None and fingerprint != self._fingerprint(request):
+            raise IdempotencyKeyReused(
+                "This idempotency key was already used for a different message"
+            )
+        return (entry[1].model_copy() if entry else None), flight
+    
+    def _start_flight(self, request: ChatRequest, run: Callable[[_Flight], Awaitable[ChatResponse]]) -> _Flight:
+        """Run the turn as a detached task and store its result when it finishes."""
+        key = (request.student_id, request.idempotency_key)
+        flight = _Flight(self._fingerprint(request))
+        self._flights[key] = flight
+        
+        async def run_flight() -> None:
+            try:
+                response = await run(flight)
+            except BaseException as e:
+                flight.finish(error=e)
+            else:
+                self._results.put(key, (flight.fingerprint, response))
+                flight.finish(response)
+            finally:
+                del self._flights[key]
+        
+        task = asyncio.ensure_future(run_flight())
+        self._flight_tasks.add(task)
+        task.add_done_callback(self._flight_tasks.discard)
+        return flight
+    
+    async def send_message(self, request: ChatRequest) -> ChatResponse:
+        """Process a chat message and get AI response."""
+        
+        if not request.idempotency_key:
+            return await self._send_message(request)
+        
+        response, flight = self._lookup(request)
+        if response is not None:
+            return response
+        if flight is None:
+            flight = self._start_flight(request, lambda flight: self._send_message(request))
+        
+        # Shielded: a client giving up must not cancel the shared turn
+        return (await asyncio.shield(flight.result)).model_copy()
+    
+    async def _send_message(self, request: ChatRequest) -> ChatResponse:
+        async with self._session_turn(request.session_id):
+            profile, session = await self._start_turn(request)
+            teaching_mode = request.teaching_mode or session.teaching_mode
+            context = ai_service.build_context(profile, session, teaching_mode)
+            
+            # Get AI response
+            reply = await ai_service.get_response(
+                profile=profile,
+                messages=context.messages,
+                teaching_mode=teaching_mode,
+                summary=context.summary
+            )
+            
+            return await self._finish_turn(request, session, reply.content, context, reply.provider)
+    
+    async def stream_message(self, request: ChatRequest) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Process a chat message and stream the AI response.
+        
+        Validation happens before the first event is produced, so a missing
+        profile or session raises ValueError from this call. The returned
+        iterator yields (event, data) pairs: "session" once, "token" per text
+        chunk and "done" with the final ChatResponse after the session is saved.
+        A duplicate of a finished or running idempotent turn replays its events.
+        """
+        
+        if not request.idempotency_key:
+            return await self._stream_events(request)
+        
+        response, flight = self._lookup(request)
+        if response is not None:
+            async def stored() -> AsyncIterator[Tuple[str, dict]]:
+                for event in _replay_events(response):
+                    yield event
+            return stored()
+        
+        if flight is None:
+            events = await self._stream_events(request)
+            # A duplicate may have started the turn while this one was validated
+            flight = self._flights.get((request.student_id, request.idempotency_key))
+        
+        if flight is None:
+            async def run(flight: _Flight) -> ChatResponse:
+                async for event, data in events:
+                    flight.publish(event, data)
+                return ChatResponse(**flight.events[-1][1])
+            
+            flight = self._start_flight(request, run)
+        
+        return flight.replay()
+    
+    async def _stream_events(self, request: ChatRequest) -> AsyncIterator[Tuple[str, dict]]:
+        # Validate now; the turn itself loads the session again once it holds the lock
+        await self._start_turn(request)
+        
+        async def events() -> AsyncIterator[Tuple[str, dict]]:
+            async with self._session_turn(request.session_id):
+                profile, session = await self._start_turn(request)
+                teaching_mode = request.teaching_mode or session.teaching_mode
+                context = ai_service.build_context(profile, session, teaching_mode)
+                
+                yield "session", {"session_id": session.session_id}
+                
+                stream = await ai_service.stream_response(
+                    profile=profile,
+                    messages=context.messages,
+                    teaching_mode=teaching_mode,
+                    summary=context.summary
+                )
+                chunks: List[str] = []
+                async for chunk in stream.chunks:
+                    chunks.append(chunk)
+                    yield "token", {"delta": chunk}
+                
+                # Persist only once the full response has arrived
+                response = await self._finish_turn(request, session, "".join(chunks), context, stream.provider)
+                yield "done", response.model_dump(mode="json")
+        
+        return events()
+    
+    async def get_session_history(self, session_id: str) -> Optional[ChatSession]:
         """Get chat history for a session."""
-        return storage_service.get_session(session_id)
+        return await storage_service.aget_session(session_id)
+    
+    async def get_session_meta(self, session_id: str, student_id: str) -> Optional[ChatSession]:
+        """Get a session's version and owner without its messages; student_id is the expected owner."""
+        return await storage_service.aget_session_meta(session_id, student_id)
+    
+    async def get_messages(
+        self,
+        session_id: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        limit: int = 50
+    ) -> Optional[MessagePage]:
+        """A window of a session's messages, the latest ones unless a cursor is given."""
+        return await storage_service.aget_messages(session_id, before, after, limit)
     
-    def get_student_sessions(self, student_id: str):
+    async def get_student_sessions(self, student_id: str):
         """Get all sessions for a student."""
-        return storage_service.get_student_sessions(student_id)
+        return await storage_service.aget_student_sessions(student_id)
+    
+    async def get_session_summaries(
+        self,
+        student_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        descending: bool = True
+    ) -> SessionSummaryPage:
+        """
+        One page of a student's sessions as summaries, ordered by updated_at.
+        
+        The cursor is opaque to clients: the (updated_at, session_id) key of
+        the last summary on the previous page. Raises ValueError if it is malformed.
+        """
+        after = _decode_cursor(cursor) if cursor else None
+        # One extra row tells whether another page follows
+        summaries = await storage_service.aget_session_summaries(student_id, limit + 1, after, descending)
+        
+        next_cursor = None
+        if len(summaries) > limit:
+            summaries = summaries[:limit]
+            next_cursor = _encode_cursor(summaries[-1].updated_at, summaries[-1].session_id)
+        return SessionSummaryPage(sessions=summaries, next_cursor=next_cursor)
 
 
 chat_controller = ChatController()
@@ -1,13 +1,14 @@
 import uuid
 from typing import Optional
 from src.models.schemas import CreateProfileRequest, StudentProfile
-from src.services.storage_service import storage_service
+from src.services.etags import etag_matches, profile_etag
+from src.services.storage_service import ProfileConflictError, storage_service
 
 
 class StudentController:
     """Controller for student profile operations."""
     
-    def create_profile(self, request: CreateProfileRequest) -> StudentProfile:
+    async def create_profile(self, request: CreateProfileRequest) -> StudentProfile:
         """Create a new student profile."""
         
         profile = StudentProfile(
@@ -20,26 +21,42 @@ class StudentController:
             career_interest=request.career_interest
         )
         
-        storage_service.save_profile(profile)
+        await storage_service.asave_profile(profile)
         return profile
     
-    def get_profile(self, student_id: str) -> Optional[StudentProfile]:
+    async def get_profile(self, student_id: str) -> Optional[StudentProfile]:
         """Get a student profile by ID."""
-        return storage_service.get_profile(student_id)
+        return await storage_service.aget_profile(student_id)
     
-    def update_profile(self, student_id: str, updates: dict) -> Optional[StudentProfile]:
-        """Update a student profile."""
+    async def update_profile(
+        self,
+        student_id: str,
+        updates: dict,
+        if_match: Optional[str] = None
+    ) -> Optional[StudentProfile]:
+        """
+        Update a student profile.
         
-        profile = storage_service.get_profile(student_id)
+        With if_match (an If-Match header), the update only applies to the
+        profile version it names; raises ProfileConflictError if the profile
+        changed since, even if another worker saves it concurrently.
+        """
+        
+        profile = await storage_service.aget_profile(student_id)
         if not profile:
             return None
+        expected_updated_at = None
+        if if_match is not None:
+            if not etag_matches(if_match, profile_etag(profile)):
+                raise ProfileConflictError(f"Profile {student_id} was updated by another request")
+            expected_updated_at = profile.updated_at
         
         # Update fields
         for key, value in updates.items():
             if hasattr(profile, key) and value is not None:
                 setattr(profile, key, value)
         
-        storage_service.save_profile(profile)
+        await storage_service.asave_profile(profile, expected_updated_at)
         return profile
 
 
@@ -22,6 +22,7 @@ class Message(BaseModel):
     role: Literal["user", "assistant", "system"]
     content: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    prompt_tokens: Optional[int] = None  # Estimated prompt size that produced this reply
 
 
 class ChatSession(BaseModel):
@@ -37,16 +38,49 @@ class ChatSession(BaseModel):
         "career_guidance"
     ]] = None
     messages: List[Message] = Field(default_factory=list)
+    summary: Optional[str] = None  # Rolling summary of turns no longer sent in full
+    summarized_count: int = 0  # Number of leading messages covered by the summary
+    version: int = 0  # Bumped on every save; saving a copy loaded at an older version fails
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class SessionSummary(BaseModel):
+    """Session metadata for session lists, without the messages."""
+    session_id: str
+    teaching_mode: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    message_count: int = 0
+    preview: Optional[str] = None  # Start of the latest message
+
+
+class SessionSummaryPage(BaseModel):
+    """One page of a student's session summaries."""
+    sessions: List[SessionSummary]
+    next_cursor: Optional[str] = None  # Pass back as cursor for the next page
+
+
+class MessagePage(BaseModel):
+    """A window of a session's messages; cursors are message positions."""
+    session_id: str
+    student_id: str
+    messages: List[Message]
+    start: int  # Position of the first returned message in the session
+    total: int  # Number of messages in the session
+    earlier_cursor: Optional[int] = None  # Pass back as before for older messages
+    later_cursor: Optional[int] = None  # Pass back as after for newer messages
+
+
 class ChatRequest(BaseModel):
     """Request to send a message to Lea."""
     student_id: str
     session_id: Optional[str] = None
     message: str
     teaching_mode: Optional[str] = None
+    # Client-generated key; retries and double submits with the same key
+    # share one provider call and get the same ChatResponse
+    idempotency_key: Optional[str] = Field(default=None, max_length=128)
 
 
 class ChatResponse(BaseModel):
@@ -54,6 +88,7 @@ class ChatResponse(BaseModel):
     session_id: str
     message: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
+    provider: Optional[str] = None  # Provider or cache that produced the reply
 
 
 class CreateProfileRequest(BaseModel):
@@ -83,8 +118,17 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class RefreshRequest(BaseModel):
+    """Request to exchange a refresh token for new tokens."""
+    refresh_token: str
+
+
 class AuthResponse(BaseModel):
     """Response after successful authentication."""
     success: bool
     message: str
-    profile: Optional[StudentProfile] = None
\ No newline at end of file
+    profile: Optional[StudentProfile] = None
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    token_type: str = "bearer"
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
\ No newline at end of file
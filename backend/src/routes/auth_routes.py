@@ -1,6 +1,6 @@
 """Authentication routes for signup and login."""
 from fastapi import APIRouter, HTTPException
-from src.models.schemas import SignupRequest, LoginRequest, AuthResponse
+from src.models.schemas import SignupRequest, LoginRequest, RefreshRequest, AuthResponse
 from src.controllers.auth_controller import auth_controller
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -10,7 +10,7 @@ router = APIRouter(prefix="/api/auth", tags=["authentication"])
 async def signup(request: SignupRequest):
     """Register a new user account."""
     try:
-        response = auth_controller.signup(request)
+        response = await auth_controller.signup(request)
         if not response.success:
             raise HTTPException(status_code=400, detail=response.message)
         return response
@@ -24,7 +24,7 @@ async def signup(request: SignupRequest):
 async def login(request: LoginRequest):
     """Login with existing credentials."""
     try:
-        response = auth_controller.login(request)
+        response = await auth_controller.login(request)
         if not response.success:
             raise HTTPException(status_code=401, detail=response.message)
         return response
@@ -32,3 +32,12 @@ async def login(request: LoginRequest):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during login: {str(e)}")
+
+
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh(request: RefreshRequest):
+    """Exchange a refresh token for a new access/refresh token pair."""
+    response = await auth_controller.refresh(request)
+    if not response.success:
+        raise HTTPException(status_code=401, detail=response.message)
+    return response
@@ -1,32 +1,155 @@
-from fastapi import APIRouter, HTTPException
-from src.models.schemas import ChatRequest, ChatResponse, ChatSession
-from src.controllers.chat_controller import chat_controller
+import json
+import math
+from typing import AsyncIterator, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from src.models.schemas import ChatRequest, ChatResponse, ChatSession, MessagePage
+from src.controllers.chat_controller import IdempotencyKeyReused, chat_controller
+from src.routes.dependencies import ensure_same_student, get_current_student_id
+from src.services.etags import etag_matches, session_etag
+from src.services.provider_scheduler import ProviderBusyError
+from src.services.storage_service import SessionConflictError
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
 @router.post("/message", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(
+    request: ChatRequest,
+    current_student_id: str = Depends(get_current_student_id),
+    idempotency_key: Optional[str] = Header(default=None, max_length=128)
+):
     """Send a message to Lea and get a response."""
+    ensure_same_student(request.student_id, current_student_id)
+    request.idempotency_key = request.idempotency_key or idempotency_key
     try:
         return await chat_controller.send_message(request)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except (IdempotencyKeyReused, SessionConflictError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ProviderBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Lea is very busy right now, please try again shortly. ({str(e)})",
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
+def _format_sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_stream(events: AsyncIterator[Tuple[str, dict]]) -> AsyncIterator[str]:
+    """Relay controller events as SSE, reporting failures as an error event."""
+    try:
+        async for event, data in events:
+            yield _format_sse(event, data)
+    except Exception as e:
+        yield _format_sse("error", {"detail": f"Error processing message: {str(e)}"})
+
+
+@router.post("/message/stream")
+async def stream_message(
+    request: ChatRequest,
+    current_student_id: str = Depends(get_current_student_id),
+    idempotency_key: Optional[str] = Header(default=None, max_length=128)
+):
+    """Send a message to Lea and stream the response as Server-Sent Events."""
+    ensure_same_student(request.student_id, current_student_id)
+    request.idempotency_key = request.idempotency_key or idempotency_key
+    try:
+        events = await chat_controller.stream_message(request)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
+    
+    return StreamingResponse(
+        _sse_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/session/{session_id}", response_model=ChatSession)
-async def get_session(session_id: str):
-    """Get chat history for a specific session."""
-    session = chat_controller.get_session_history(session_id)
-    if not session:
+async def get_session(
+    session_id: str,
+    response: Response,
+    current_student_id: str = Depends(get_current_student_id),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    Get chat history for a specific session.
+    
+    Returns 304 if If-None-Match names the session's ETag, which is
+    checked without loading the messages.
+    """
+    if if_none_match is not None:
+        meta = await chat_controller.get_session_meta(session_id, current_student_id)
+        if meta and meta.student_id == current_student_id and etag_matches(
+            if_none_match, session_etag(meta), weak=True
+        ):
+            return Response(status_code=304, headers={"ETag": session_etag(meta)})
+    
+    session = await chat_controller.get_session_history(session_id)
+    # Another student's session is reported as missing rather than forbidden
+    if not session or session.student_id != current_student_id:
         raise HTTPException(status_code=404, detail="Session not found")
+    response.headers["ETag"] = session_etag(session)
     return session
 
 
+@router.get("/session/{session_id}/messages", response_model=MessagePage)
+async def get_session_messages(
+    session_id: str,
+    before: Optional[int] = Query(default=None, ge=0),
+    after: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=50, ge=1, le=200),
+    current_student_id: str = Depends(get_current_student_id)
+):
+    """
+    Get a window of a session's messages, the latest ones by default.
+    
+    Pass earlier_cursor back as before to page towards the start of the
+    session, or later_cursor as after to page towards the end.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Pass either before or after, not both")
+    page = await chat_controller.get_messages(session_id, before, after, limit)
+    if not page or page.student_id != current_student_id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return page
+
+
 @router.get("/student/{student_id}/sessions")
-async def get_student_sessions(student_id: str):
-    """Get all chat sessions for a student."""
-    sessions = chat_controller.get_student_sessions(student_id)
+async def get_student_sessions(
+    student_id: str,
+    view: Literal["full", "summary"] = "full",
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    order: Literal["desc", "asc"] = "desc",
+    current_student_id: str = Depends(get_current_student_id)
+):
+    """
+    Get all chat sessions for a student.
+    
+    With view=summary, returns one page of session metadata (no messages)
+    ordered by updated_at; limit, cursor and order apply to that view only.
+    """
+    ensure_same_student(student_id, current_student_id)
+    if view == "summary":
+        try:
+            return await chat_controller.get_session_summaries(
+                student_id, limit, cursor, descending=order == "desc"
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    sessions = await chat_controller.get_student_sessions(student_id)
     return {"sessions": sessions}
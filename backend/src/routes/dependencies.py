@@ -0,0 +1,30 @@
+"""Shared route dependencies."""
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from src.services.token_service import InvalidTokenError, token_service
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_student_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> str:
+    """Authenticate the request from its bearer access token (no storage access)."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        claims = token_service.verify(credentials.credentials, "access")
+    except InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    return claims["sub"]
+
+
+def ensure_same_student(student_id: str, current_student_id: str) -> None:
+    """Reject access to another student's data."""
+    if student_id != current_student_id:
+        raise HTTPException(status_code=403, detail="Not allowed to access this student's data")
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from src.models.schemas import CreateProfileRequest, StudentProfile
 from src.controllers.student_controller import student_controller
+from src.routes.dependencies import ensure_same_student, get_current_student_id
+from src.services.etags import etag_matches, profile_etag
+from src.services.storage_service import EmailTakenError, ProfileConflictError
 
 router = APIRouter(prefix="/api/students", tags=["students"])
 
@@ -9,24 +13,49 @@ router = APIRouter(prefix="/api/students", tags=["students"])
 async def create_profile(request: CreateProfileRequest):
     """Create a new student profile."""
     try:
-        return student_controller.create_profile(request)
+        return await student_controller.create_profile(request)
+    except EmailTakenError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating profile: {str(e)}")
 
 
 @router.get("/profile/{student_id}", response_model=StudentProfile)
-async def get_profile(student_id: str):
-    """Get a student profile by ID."""
-    profile = student_controller.get_profile(student_id)
+async def get_profile(
+    student_id: str,
+    response: Response,
+    current_student_id: str = Depends(get_current_student_id),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """Get a student profile by ID; 304 if If-None-Match names its ETag."""
+    ensure_same_student(student_id, current_student_id)
+    profile = await student_controller.get_profile(student_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
+    etag = profile_etag(profile)
+    if etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return profile
 
 
 @router.patch("/profile/{student_id}", response_model=StudentProfile)
-async def update_profile(student_id: str, updates: dict):
-    """Update a student profile."""
-    profile = student_controller.update_profile(student_id, updates)
+async def update_profile(
+    student_id: str,
+    updates: dict,
+    response: Response,
+    current_student_id: str = Depends(get_current_student_id),
+    if_match: Optional[str] = Header(default=None)
+):
+    """Update a student profile; with If-Match, only if it still has that ETag (else 412)."""
+    ensure_same_student(student_id, current_student_id)
+    try:
+        profile = await student_controller.update_profile(student_id, updates, if_match)
+    except ProfileConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except EmailTakenError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
+    response.headers["ETag"] = profile_etag(profile)
     return profile
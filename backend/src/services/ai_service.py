@@ -1,14 +1,68 @@
-from typing import List, Optional
-from openai import OpenAI
-from google import genai
-from google.genai import types
-from groq import Groq
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
 from src.config.settings import settings
-from src.models.schemas import Message, StudentProfile
+from src.models.schemas import ChatSession, Message, StudentProfile
+from src.services.context_builder import ContextWindow, context_builder, estimate_tokens, message_tokens
+from src.services.mock_provider import MockProvider
+from src.services.provider_scheduler import HeldSlotStream, ProviderScheduler
+from src.services.providers import (
+    MAX_OUTPUT_TOKENS, GeminiProvider, GroqProvider, LLMProvider, OpenAIProvider
+)
+from src.services.response_cache import ResponseCache
+from src.services.semantic_cache import SemanticCache
+
+
+T = TypeVar("T")
+
+PROVIDER_CLASSES = {
+    "openai": OpenAIProvider,
+    "gemini": GeminiProvider,
+    "groq": GroqProvider,
+    "mock": MockProvider,
+}
+
+# Recent successful latencies kept per provider for the hedging percentile
+LATENCY_WINDOW = 200
+
+
+def create_provider(name: str, max_retries: Optional[int] = None) -> LLMProvider:
+    """Instantiate a provider by its settings name (max_retries=None keeps the SDK default)."""
+    if name not in PROVIDER_CLASSES:
+        raise ValueError(f"Unknown AI provider: {name}")
+    return PROVIDER_CLASSES[name](max_retries=max_retries)
+
+
+@dataclass
+class AIReply:
+    """A complete reply and where it came from (provider name or cache)."""
+    content: str
+    provider: str
+
+
+@dataclass
+class AIStream:
+    """A streamed reply; the provider is known once the first chunk arrived."""
+    provider: str
+    chunks: AsyncIterator[str]
 
 
 class AIService:
-    """Service for AI integration with OpenAI, Google Gemini, or Groq."""
+    """
+    Service for AI integration with OpenAI, Google Gemini, Groq, or a local mock.
+    
+    Providers are tried in the order settings.ai_provider followed by
+    settings.ai_fallback_providers; a provider that errors or exceeds its
+    timeout fails over to the next one. With hedging enabled, a request that
+    has not been answered within the provider's recent latency percentile is
+    also sent to the next provider and the first answer wins. For streams,
+    "answered" means the first chunk arrived; after that there is no failover.
+    
+    Every provider call goes through that provider's ProviderScheduler, which
+    enforces its rate and concurrency limits and retries 429 responses.
+    """
     
     def __init__(self):
         self.provider = settings.ai_provider
@@ -16,30 +70,45 @@ class AIService:
         # Debug: Print loaded configuration
         print(f"[AI Service] Initializing with provider: {self.provider}")
         
-        if self.provider == "openai":
-            if not settings.openai_api_key:
-                raise ValueError("OpenAI API key is not set. Please check your .env file.")
-            self.client = OpenAI(api_key=settings.openai_api_key)
-            self.model = settings.openai_model
-            print(f"[AI Service] OpenAI initialized with model: {self.model}")
-            
-        elif self.provider == "gemini":
-            if not settings.gemini_api_key:
-                raise ValueError("Gemini API key is not set. Please check your .env file.")
-            self.client = genai.Client(api_key=settings.gemini_api_key)
-            self.model = settings.gemini_model
-            print(f"[AI Service] Gemini initialized with model: {self.model}")
-            
-        elif self.provider == "groq":
-            if not settings.groq_api_key:
-                raise ValueError("Groq API key is not set. Please check your .env file.")
-            self.client = Groq(api_key=settings.groq_api_key)
-            self.model = settings.groq_model
-            print(f"[AI Service] Groq initialized with model: {self.model}")
-        else:
-            raise ValueError(f"Unknown AI provider: {self.provider}")
-    
-    def _build_system_prompt(self, profile: StudentProfile, teaching_mode: Optional[str] = None) -> str:
+        chain = list(dict.fromkeys([self.provider, *settings.ai_fallback_providers]))
+        # With fallbacks, retries happen here (rate limits in the scheduler, other
+        # errors by failover), so the SDKs must not multiply them with their own.
+        # A lone provider has nothing to fail over to and keeps the SDK's retries
+        # of 5xx and connection errors.
+        max_retries = 0 if len(chain) > 1 else None
+        self.providers: List[LLMProvider] = []
+        for name in chain:
+            provider = create_provider(name, max_retries=max_retries)
+            self.providers.append(provider)
+            print(f"[AI Service] {name} initialized with model: {provider.model}")
+        
+        self.schedulers: Dict[str, ProviderScheduler] = {
+            provider.name: ProviderScheduler.from_settings(provider.name) for provider in self.providers
+        }
+        
+        self.model = self.providers[0].model
+        
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self._counts: Dict[str, Dict[str, int]] = {
+            provider.name: {"served": 0, "errors": 0, "timeouts": 0} for provider in self.providers
+        }
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        
+        self.response_cache = ResponseCache()
+        self.semantic_cache = SemanticCache()
+    
+    @property
+    def client(self):
+        """The primary provider's SDK client (built on first access)."""
+        return self.providers[0].client
+    
+    def _build_system_prompt(
+        self,
+        profile: StudentProfile,
+        teaching_mode: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> str:
         """Build system prompt based on student profile and teaching mode."""
         
         base_prompt = f"""You are Lea, a calm, structured, and human-like German language tutor from GermanLeap.
@@ -60,7 +129,7 @@ Your Teaching Style:
 - Focus on practical, real-world German usage
 
 """
-        
+
         mode_prompts = {
             "grammar_practice": "Focus on teaching German grammar with clear explanations, examples, and exercises appropriate for their level.",
             "vocabulary_building": "Help build vocabulary through context-based learning, themed word groups, and practical usage examples.",
@@ -73,100 +142,283 @@ Your Teaching Style:
         if teaching_mode and teaching_mode in mode_prompts:
             base_prompt += f"\nCurrent Teaching Mode: {teaching_mode.replace('_', ' ').title()}\n{mode_prompts[teaching_mode]}"
         
+        if summary:
+            base_prompt += f"\n\nSummary of the earlier conversation (older turns are not shown in full):\n{summary}"
+        
         return base_prompt
     
-    async def get_response(
+    def build_context(
         self,
         profile: StudentProfile,
-        messages: List[Message],
+        session: ChatSession,
         teaching_mode: Optional[str] = None
-    ) -> str:
-        """Get AI response from the configured provider."""
-        
+    ) -> ContextWindow:
+        """Fit the session history into the prompt token budget for the next turn."""
         system_prompt = self._build_system_prompt(profile, teaching_mode)
+        return context_builder.build(system_prompt, session)
+    
+    def _response_cache_key(
+        self,
+        system_prompt: str,
+        profile: StudentProfile,
+        messages: List[Message],
+        teaching_mode: Optional[str],
+        summary: Optional[str]
+    ) -> Optional[str]:
+        """Exact-match cache key for a standalone turn in a cached mode, else None."""
         
-        if self.provider == "openai":
-            return await self._get_openai_response(system_prompt, messages)
-        elif self.provider == "gemini":
-            return await self._get_gemini_response(system_prompt, messages)
-        elif self.provider == "groq":
-            return await self._get_groq_response(system_prompt, messages)
+        if not self.response_cache.applies_to(teaching_mode) or not self._is_standalone(messages, summary):
+            return None
+        return self.response_cache.make_key(
+            system_prompt, teaching_mode, profile.current_level, messages[-1].content
+        )
     
-    async def _get_openai_response(self, system_prompt: str, messages: List[Message]) -> str:
-        """Get response from OpenAI."""
+    def _is_standalone(self, messages: List[Message], summary: Optional[str]) -> bool:
+        """Replies that depend on earlier turns are never shared between students."""
+        return not summary and len(messages) == 1
+    
+    async def _cached_reply(
+        self,
+        cache_key: Optional[str],
+        profile: StudentProfile,
+        messages: List[Message],
+        teaching_mode: Optional[str],
+        summary: Optional[str]
+    ) -> Optional[AIReply]:
+        """Look the turn up in the exact-match cache, then the semantic cache."""
+        
+        if cache_key:
+            cached = await asyncio.to_thread(self.response_cache.get, cache_key, teaching_mode)
+            if cached is not None:
+                return AIReply(content=cached, provider="response_cache")
         
-        formatted_messages = [{"role": "system", "content": system_prompt}]
+        if self.semantic_cache.applies_to(teaching_mode) and self._is_standalone(messages, summary):
+            cached = await asyncio.to_thread(
+                self.semantic_cache.lookup, profile.current_level, teaching_mode, messages[-1].content
+            )
+            if cached is not None:
+                return AIReply(content=cached, provider="semantic_cache")
+        return None
+    
+    async def _cache_reply(
+        self,
+        cache_key: Optional[str],
+        profile: StudentProfile,
+        messages: List[Message],
+        teaching_mode: Optional[str],
+        summary: Optional[str],
+        response: str
+    ) -> None:
+        """Remember a fresh reply in the caches that apply to this turn."""
         
-        for msg in messages:
-            formatted_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        # A reply that addresses the student by name must not be served to others
+        first_name = profile.name.split()[0] if profile.name.split() else ""
+        if not response or (first_name and first_name.casefold() in response.casefold()):
+            return
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=formatted_messages,
-                temperature=0.7,
-                max_tokens=1000
+        if cache_key:
+            await asyncio.to_thread(self.response_cache.put, cache_key, teaching_mode, response)
+        if self.semantic_cache.applies_to(teaching_mode) and self._is_standalone(messages, summary):
+            await asyncio.to_thread(
+                self.semantic_cache.store, profile.current_level, teaching_mode,
+                messages[-1].content, response
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"[AI Service] OpenAI Error: {str(e)}")
+    
+    def _hedge_delay(self, provider: LLMProvider, kind: str) -> float:
+        """Seconds to wait for a provider before hedging to the next one."""
+        samples = self._latencies.get((provider.name, kind))
+        if not samples or len(samples) < settings.hedge_min_samples:
+            return settings.hedge_default_delay_ms / 1000
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * settings.hedge_percentile))]
+    
+    async def _attempt(
+        self,
+        provider: LLMProvider,
+        call: Callable[[LLMProvider], Awaitable[T]],
+        kind: str
+    ) -> T:
+        """Run one provider call, recording latency and failures."""
+        start = time.monotonic()
+        try:
+            result = await call(provider)
+        except TimeoutError:
+            self._counts[provider.name]["timeouts"] += 1
+            raise
+        except Exception:
+            self._counts[provider.name]["errors"] += 1
             raise
+        
+        samples = self._latencies.setdefault((provider.name, kind), deque(maxlen=LATENCY_WINDOW))
+        samples.append(time.monotonic() - start)
+        return result
     
-    async def _get_gemini_response(self, system_prompt: str, messages: List[Message]) -> str:
-        """Get response from Google Gemini."""
+    async def _call(
+        self,
+        call: Callable[[LLMProvider], Awaitable[T]],
+        kind: str,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None
+    ) -> Tuple[T, LLMProvider]:
+        """
+        Run call against the provider chain with failover and optional hedging.
+        
+        discard releases the result of a hedged call that finished but lost.
+        """
+        remaining = list(self.providers)
+        last_error: Optional[BaseException] = None
         
-        # Build conversation history with system prompt
-        conversation_parts = [system_prompt + "\n\n"]
+        while remaining:
+            primary = remaining.pop(0)
+            tasks = {asyncio.ensure_future(self._attempt(primary, call, kind)): primary}
+            try:
+                if settings.hedge_enabled and remaining:
+                    done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary, kind))
+                    if not done:
+                        secondary = remaining.pop(0)
+                        self.hedges_fired += 1
+                        tasks[asyncio.ensure_future(self._attempt(secondary, call, kind))] = secondary
+                
+                while tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    winner = None
+                    for task in done:
+                        provider = tasks.pop(task)
+                        if task.exception() is not None:
+                            last_error = task.exception()
+                            print(f"[AI Service] {provider.name} failed, trying next provider: {last_error}")
+                        elif winner is None:
+                            winner = (task.result(), provider)
+                        elif discard:
+                            await discard(task.result())
+                    
+                    if winner:
+                        self._counts[winner[1].name]["served"] += 1
+                        if winner[1] is not primary:
+                            self.hedges_won += 1
+                        return winner
+            finally:
+                # Cancel the slower hedged request, if still running
+                for task in tasks:
+                    task.cancel()
         
-        for msg in messages:
-            if msg.role == "user":
-                conversation_parts.append(f"User: {msg.content}")
-            elif msg.role == "assistant":
-                conversation_parts.append(f"Assistant: {msg.content}")
+        raise last_error
+    
+    def _request_tokens(self, system_prompt: str, messages: List[Message]) -> int:
+        """Tokens a request counts against a provider's tokens/min limit."""
+        return estimate_tokens(system_prompt) + sum(message_tokens(m) for m in messages) + MAX_OUTPUT_TOKENS
+    
+    async def get_response(
+        self,
+        profile: StudentProfile,
+        messages: List[Message],
+        teaching_mode: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> AIReply:
+        """Get AI response from the provider chain (or the response caches)."""
         
-        # Add the final prompt
-        full_prompt = "\n\n".join(conversation_parts)
+        system_prompt = self._build_system_prompt(profile, teaching_mode, summary)
         
-        try:
-            # Generate response
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=full_prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.7,
-                    max_output_tokens=1000,
-                )
+        cache_key = self._response_cache_key(system_prompt, profile, messages, teaching_mode, summary)
+        cached = await self._cached_reply(cache_key, profile, messages, teaching_mode, summary)
+        if cached is not None:
+            return cached
+        
+        tokens = self._request_tokens(system_prompt, messages)
+        
+        async def complete(provider: LLMProvider) -> str:
+            return await self.schedulers[provider.name].run(
+                profile.student_id, tokens,
+                lambda: provider.complete(system_prompt, messages),
+                provider.timeout_seconds
             )
-            return response.text
-        except Exception as e:
-            print(f"[AI Service] Gemini Error: {str(e)}")
-            raise
+        
+        response, provider = await self._call(complete, "complete")
+        
+        await self._cache_reply(cache_key, profile, messages, teaching_mode, summary, response)
+        return AIReply(content=response, provider=provider.name)
     
-    async def _get_groq_response(self, system_prompt: str, messages: List[Message]) -> str:
-        """Get response from Groq."""
+    async def stream_response(
+        self,
+        profile: StudentProfile,
+        messages: List[Message],
+        teaching_mode: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> AIStream:
+        """
+        Start streaming the AI response from the provider chain.
         
-        formatted_messages = [{"role": "system", "content": system_prompt}]
+        Returns once the first chunk has arrived (failover and hedging apply
+        until then); the returned stream yields the remaining text chunks.
+        """
         
-        for msg in messages:
-            formatted_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        system_prompt = self._build_system_prompt(profile, teaching_mode, summary)
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=formatted_messages,
-                temperature=0.7,
-                max_tokens=1000
+        cache_key = self._response_cache_key(system_prompt, profile, messages, teaching_mode, summary)
+        cached = await self._cached_reply(cache_key, profile, messages, teaching_mode, summary)
+        if cached is not None:
+            async def cached_chunks() -> AsyncIterator[str]:
+                yield cached.content
+            return AIStream(provider=cached.provider, chunks=cached_chunks())
+        
+        tokens = self._request_tokens(system_prompt, messages)
+        
+        async def open_stream(provider: LLMProvider) -> Tuple[AsyncIterator[str], str]:
+            chunks = provider.stream(system_prompt, messages)
+            try:
+                return chunks, await chunks.__anext__()
+            except StopAsyncIteration:
+                return chunks, ""
+            except BaseException:
+                await chunks.aclose()
+                raise
+        
+        async def first_chunk(provider: LLMProvider) -> Tuple[AsyncIterator[str], str]:
+            # The stream occupies a provider slot until it has been read or closed
+            scheduler = self.schedulers[provider.name]
+            chunks, first = await scheduler.run(
+                profile.student_id, tokens, lambda: open_stream(provider),
+                provider.timeout_seconds, keep_slot=True
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"[AI Service] Groq Error: {str(e)}")
-            raise
+            return HeldSlotStream(chunks, scheduler.release), first
+        
+        (chunks, first), provider = await self._call(
+            first_chunk, "stream", discard=lambda started: started[0].aclose()
+        )
+        
+        async def relay() -> AsyncIterator[str]:
+            parts = [first]
+            try:
+                if first:
+                    yield first
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    yield chunk
+            finally:
+                await chunks.aclose()
+            
+            # Only a stream that ran to completion is cached
+            await self._cache_reply(cache_key, profile, messages, teaching_mode, summary, "".join(parts))
+        
+        return AIStream(provider=provider.name, chunks=relay())
+    
+    def provider_stats(self) -> Dict:
+        """Requests served, failures and queueing per provider, plus hedging counters."""
+        providers = {}
+        for name, counts in self._counts.items():
+            latencies = sorted(self._latencies.get((name, "complete"), ()))
+            providers[name] = dict(
+                counts,
+                queue=self.schedulers[name].stats(),
+                p50_ms=round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                p99_ms=round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1)
+                if latencies else None
+            )
+        return {
+            "chain": [provider.name for provider in self.providers],
+            "providers": providers,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
 
 
-ai_service = AIService()
\ No newline at end of file
+ai_service = AIService()
@@ -0,0 +1,144 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from src.config.settings import settings
+from src.models.schemas import ChatSession, Message
+
+
+# Words and individual punctuation marks; long words cost roughly one token per 4 chars
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Role/formatting overhead the chat APIs add per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the provider token count of a text without a network call."""
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ContextWindow:
+    """Messages and summary actually sent to the provider for one turn."""
+    messages: List[Message]
+    summary: Optional[str]
+    prompt_tokens: int
+    history_tokens: int
+
+
+class ContextBuilder:
+    """
+    Fit a session's history into a prompt token budget.
+    
+    The system prompt and the most recent messages are sent verbatim. Older
+    messages are folded into session.summary, a rolling extractive summary
+    that only ever has new lines appended (oldest lines are dropped once it
+    exceeds its own budget), so it is never regenerated from scratch.
+    session.summarized_count records how many messages it covers.
+    """
+    
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        summary_max_tokens: Optional[int] = None
+    ):
+        self.token_budget = token_budget or settings.context_token_budget
+        self.summary_max_tokens = summary_max_tokens or settings.context_summary_max_tokens
+        
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.history_tokens = 0
+    
+    def _summary_line(self, message: Message) -> str:
+        speaker = "Student" if message.role == "user" else "Lea"
+        text = " ".join(message.content.split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + " ..."
+        return f"- {speaker}: {text}"
+    
+    def _fold_into_summary(self, session: ChatSession, upto: int) -> None:
+        """Append summary lines for messages[summarized_count:upto]."""
+        lines = session.summary.splitlines() if session.summary else []
+        for message in session.messages[session.summarized_count:upto]:
+            if message.role != "system":
+                lines.append(self._summary_line(message))
+        
+        # Keep the summary itself bounded by dropping its oldest lines
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_max_tokens:
+            lines.pop(0)
+        
+        session.summary = "\n".join(lines) or None
+        session.summarized_count = upto
+    
+    def _window_start(self, messages: List[Message], floor: int, available: int):
+        """Walk back from the newest message; the latest one is always included."""
+        start = len(messages)
+        used = 0
+        while start > floor:
+            cost = message_tokens(messages[start - 1])
+            if used + cost > available and start < len(messages):
+                break
+            used += cost
+            start -= 1
+        return start, used
+    
+    def build(self, system_prompt: str, session: ChatSession) -> ContextWindow:
+        """
+        Select the messages to send for the next turn.
+        
+        Updates session.summary/summarized_count in place; the caller persists
+        them with the session.
+        """
+        messages = session.messages
+        system_tokens = estimate_tokens(system_prompt)
+        summary_tokens = estimate_tokens(session.summary) if session.summary else 0
+        
+        start, used = self._window_start(
+            messages, session.summarized_count,
+            self.token_budget - system_tokens - summary_tokens
+        )
+        if start > session.summarized_count:
+            # Folding grows the summary, so reserve its full budget before folding
+            start, used = self._window_start(
+                messages, session.summarized_count,
+                self.token_budget - system_tokens - self.summary_max_tokens
+            )
+            self._fold_into_summary(session, start)
+        
+        summary_tokens = estimate_tokens(session.summary) if session.summary else 0
+        window = ContextWindow(
+            messages=messages[start:],
+            summary=session.summary,
+            prompt_tokens=system_tokens + summary_tokens + used,
+            history_tokens=system_tokens + sum(message_tokens(m) for m in messages)
+        )
+        
+        with self._lock:
+            self.turns += 1
+            self.prompt_tokens += window.prompt_tokens
+            self.history_tokens += window.history_tokens
+        return window
+    
+    def stats(self) -> Dict[str, float]:
+        """Prompt sizes actually sent versus sending the full history."""
+        return {
+            "turns": self.turns,
+            "prompt_tokens": self.prompt_tokens,
+            "full_history_tokens": self.history_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.turns, 1) if self.turns else 0.0,
+            "savings": (
+                round(1 - self.prompt_tokens / self.history_tokens, 4)
+                if self.history_tokens else 0.0
+            ),
+        }
+
+
+context_builder = ContextBuilder()
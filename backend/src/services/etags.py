@@ -0,0 +1,34 @@
+"""Strong ETags for profiles and sessions, and conditional request checks."""
+from typing import Optional
+from src.models.schemas import ChatSession, StudentProfile
+
+# Every save sets updated_at, so it identifies a stored version of the model
+STAMP_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def profile_etag(profile: StudentProfile) -> str:
+    return f'"p-{profile.updated_at.strftime(STAMP_FORMAT)}"'
+
+
+def session_etag(session: ChatSession) -> str:
+    return f'"s{session.version}-{session.updated_at.strftime(STAMP_FORMAT)}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = False) -> bool:
+    """
+    Whether an If-None-Match (weak=True) or If-Match header lists etag.
+    
+    If-None-Match compares weakly (a W/ prefix is ignored); If-Match
+    compares strongly, so weak validators never match.
+    """
+    if header is None:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import math
+import random
+from typing import AsyncIterator, List, Optional
+from src.config.settings import settings
+from src.models.schemas import Message
+from src.services.providers import LLMProvider
+
+
+CANNED_RESPONSES = [
+    "Sehr gut! Let's look at this step by step. In German, the verb always comes in "
+    "second position in a main clause: \"Heute lerne ich Deutsch.\" (Today I am learning German.)",
+    "Gute Frage! \"Das\" is an article or pronoun, while \"dass\" is a conjunction that "
+    "introduces a subordinate clause: \"Ich weiß, dass das Buch gut ist.\"",
+    "Let's practise some vocabulary: der Bahnhof (train station), die Fahrkarte (ticket), "
+    "das Gleis (platform). Can you build a sentence with each word?",
+    "Here is a B1-style exam task: Schreiben Sie eine E-Mail an Ihren Vermieter und "
+    "beschreiben Sie ein Problem in Ihrer Wohnung. Write about 80 words.",
+    "In a German job interview you might hear: \"Warum möchten Sie bei uns arbeiten?\" "
+    "A good answer is concrete, honest and connects your experience to the role.",
+]
+
+
+class MockProvider(LLMProvider):
+    """
+    Deterministic local stand-in for an LLM provider, used for offline load tests.
+    
+    Latency is drawn from a seeded distribution; replies are canned (picked by
+    a hash of the last user message) or echo the user message. Streaming emits
+    the reply word by word at a fixed token rate.
+    """
+    
+    name = "mock"
+    
+    def __init__(self, max_retries: Optional[int] = None):
+        super().__init__("mock", settings.mock_timeout_seconds)
+        self.latency_ms = settings.mock_latency_ms
+        self.jitter_ms = settings.mock_latency_jitter_ms
+        self.distribution = settings.mock_latency_distribution
+        self.tokens_per_second = settings.mock_tokens_per_second
+        self.response_mode = settings.mock_response_mode
+        self._random = random.Random(settings.mock_seed)
+    
+    def _sample_latency(self) -> float:
+        """Time to first token in seconds."""
+        if self.distribution == "fixed" or self.jitter_ms <= 0:
+            latency = self.latency_ms
+        elif self.distribution == "uniform":
+            latency = self._random.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.distribution == "normal":
+            latency = self._random.gauss(self.latency_ms, self.jitter_ms)
+        else:
+            # Lognormal with the configured mean and standard deviation: long tail like real APIs
+            sigma2 = math.log(1 + (self.jitter_ms / self.latency_ms) ** 2)
+            mu = math.log(self.latency_ms) - sigma2 / 2
+            latency = self._random.lognormvariate(mu, math.sqrt(sigma2))
+        return max(0.0, latency) / 1000
+    
+    def _reply(self, messages: List[Message]) -> str:
+        last_user = next((m.content for m in reversed(messages) if m.role == "user"), "")
+        if self.response_mode == "echo":
+            return f"Echo: {last_user}"
+        
+        digest = hashlib.sha256(last_user.encode("utf-8")).digest()
+        return CANNED_RESPONSES[digest[0] % len(CANNED_RESPONSES)]
+    
+    async def complete(self, system_prompt: str, messages: List[Message]) -> str:
+        """Return the whole reply after the simulated generation time."""
+        reply = self._reply(messages)
+        tokens = len(reply.split(" "))
+        await asyncio.sleep(self._sample_latency() + tokens / self.tokens_per_second)
+        return reply
+    
+    async def stream(self, system_prompt: str, messages: List[Message]) -> AsyncIterator[str]:
+        """Yield the reply word by word at the configured token rate."""
+        reply = self._reply(messages)
+        await asyncio.sleep(self._sample_latency())
+        for i, word in enumerate(reply.split(" ")):
+            yield word if i == 0 else " " + word
+            await asyncio.sleep(1 / self.tokens_per_second)
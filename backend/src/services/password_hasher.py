@@ -0,0 +1,45 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from src.config.settings import settings
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification off the event loop.
+    
+    bcrypt releases the GIL, so a dedicated thread pool gives real parallelism
+    without blocking request handling. The pool bounds CPU use; the semaphore
+    caps how many hashes are admitted at once so a login burst waits cheaply
+    on the event loop instead of piling up in the pool's queue.
+    """
+    
+    def __init__(self):
+        self.pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=settings.bcrypt_rounds
+        )
+        self.workers = settings.password_hash_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="password-hash"
+        )
+        self._semaphore = asyncio.Semaphore(settings.password_hash_max_concurrency)
+    
+    async def _run(self, fn, *args):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+    
+    async def hash(self, password: str) -> str:
+        """Hash a password."""
+        return await self._run(self.pwd_context.hash, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash."""
+        return await self._run(self.pwd_context.verify, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,283 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from src.config.settings import settings
+
+
+T = TypeVar("T")
+
+# Recent queue waits kept for the wait-time percentiles
+WAIT_WINDOW = 500
+
+
+class ProviderBusyError(Exception):
+    """The provider is rate limited or its queue is full; retry after retry_after seconds."""
+    
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second, holding at most a minute's worth."""
+    
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 when the bucket is unlimited)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+    
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self.tokens -= min(amount, self.capacity)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Seconds a provider asked us to wait, or None when the error is not a rate limit.
+    
+    Handles the OpenAI/Groq SDK errors (status_code, response headers) and
+    google-genai errors (code). A 429 without a Retry-After header returns 0.
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    
+    return 0.0 if status == 429 else None
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    tokens: float
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class HeldSlotStream:
+    """Async iterator that releases a scheduler slot when the stream ends or is closed."""
+    
+    def __init__(self, chunks: AsyncIterator[str], release: Callable[[], None]):
+        self._chunks = chunks
+        self._release = release
+        self._released = False
+    
+    def __aiter__(self) -> "HeldSlotStream":
+        return self
+    
+    async def __anext__(self) -> str:
+        try:
+            return await self._chunks.__anext__()
+        except BaseException:
+            await self.aclose()
+            raise
+    
+    async def aclose(self) -> None:
+        if not self._released:
+            self._released = True
+            self._release()
+            await self._chunks.aclose()
+
+
+class ProviderScheduler:
+    """
+    Admission control for one provider.
+    
+    Requests wait in a per-student FIFO; students are served round-robin so
+    one busy student cannot starve the rest. A request is admitted when a
+    concurrency slot is free and the requests/min and tokens/min buckets can
+    cover it. Rate-limit responses are retried after the provider's
+    Retry-After (plus jitter), and pause admission for everyone meanwhile.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 64
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._active = 0
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self._waits: Deque[float] = deque(maxlen=WAIT_WINDOW)
+    
+    @classmethod
+    def from_settings(cls, name: str) -> "ProviderScheduler":
+        return cls(
+            name,
+            requests_per_minute=getattr(settings, f"{name}_requests_per_minute"),
+            tokens_per_minute=getattr(settings, f"{name}_tokens_per_minute"),
+            max_concurrency=getattr(settings, f"{name}_max_concurrency")
+        )
+    
+    def _dispatch(self) -> None:
+        """Admit queued requests round-robin while capacity allows."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        while self._queues and self._active < self.max_concurrency:
+            student_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():  # Cancelled while queued
+                self._pop(student_id, queue)
+                continue
+            
+            delay = max(
+                self._paused_until - time.monotonic(),
+                self._requests.time_until(1),
+                self._tokens.time_until(waiter.tokens)
+            )
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            
+            self._pop(student_id, queue)
+            self._requests.take(1)
+            self._tokens.take(waiter.tokens)
+            self._active += 1
+            self.admitted += 1
+            self._waits.append(time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+    
+    def _pop(self, student_id: str, queue: Deque[_Waiter]) -> None:
+        queue.popleft()
+        self.queue_depth -= 1
+        if queue:
+            self._queues.move_to_end(student_id)  # Next student's turn
+        else:
+            del self._queues[student_id]
+    
+    async def acquire(self, student_id: str, tokens: float) -> None:
+        """Wait for a slot, up to settings.provider_queue_timeout_seconds."""
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+        self._queues.setdefault(student_id, deque()).append(waiter)
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._dispatch()
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), settings.provider_queue_timeout_seconds)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()  # Admitted just as we gave up
+            else:
+                waiter.future.cancel()  # Dropped from its queue on the next dispatch
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise ProviderBusyError(
+                    f"{self.name} is at capacity; queued longer than "
+                    f"{settings.provider_queue_timeout_seconds:g} s",
+                    retry_after=max(1.0, self._paused_until - time.monotonic())
+                )
+            raise
+    
+    def release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+    
+    def _backoff(self, retry_after: float, attempt: int) -> float:
+        """Provider's Retry-After (or exponential backoff) stretched by random jitter."""
+        base = retry_after or settings.rate_limit_backoff_seconds * 2 ** attempt
+        return base * random.uniform(1.0, 1.0 + settings.rate_limit_jitter)
+    
+    async def run(
+        self,
+        student_id: str,
+        tokens: float,
+        call: Callable[[], Awaitable[T]],
+        timeout_seconds: float,
+        keep_slot: bool = False
+    ) -> T:
+        """
+        Run call once admitted, retrying rate-limit errors.
+        
+        timeout_seconds bounds each provider attempt, not the queue wait. With
+        keep_slot the slot stays taken after success and the caller must
+        release() it (used for streams, which occupy the provider until done).
+        """
+        await self.acquire(student_id, tokens)
+        try:
+            for attempt in range(settings.rate_limit_max_retries + 1):
+                try:
+                    result = await asyncio.wait_for(call(), timeout_seconds)
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{self.name} did not answer within {timeout_seconds:g} s")
+                except Exception as e:
+                    retry_after = retry_after_seconds(e)
+                    if retry_after is None:
+                        raise
+                    self.rate_limited += 1
+                    delay = self._backoff(retry_after, attempt)
+                    if attempt == settings.rate_limit_max_retries:
+                        raise ProviderBusyError(f"{self.name} is rate limiting requests", delay) from e
+                    print(f"[AI Service] {self.name} rate limited; retrying in {delay:.1f} s")
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    await asyncio.sleep(delay)
+        except BaseException:
+            self.release()
+            raise
+        
+        if not keep_slot:
+            self.release()
+        return result
+    
+    def stats(self) -> Dict:
+        """Queue depth, admission counts and queue wait percentiles."""
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_p99_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 1) if waits else 0.0,
+        }
@@ -0,0 +1,240 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.config.settings import settings
+from src.models.schemas import Message
+
+
+# Reply length limit sent with every request (also counted against tokens/min)
+MAX_OUTPUT_TOKENS = 1000
+
+
+def format_chat_messages(system_prompt: str, messages: List[Message]) -> List[Dict[str, str]]:
+    """Build an OpenAI-style message list (also used by Groq)."""
+    
+    formatted_messages = [{"role": "system", "content": system_prompt}]
+    
+    for msg in messages:
+        formatted_messages.append({
+            "role": msg.role,
+            "content": msg.content
+        })
+    
+    return formatted_messages
+
+
+def format_gemini_prompt(system_prompt: str, messages: List[Message]) -> str:
+    """Flatten the conversation into a single Gemini prompt."""
+    
+    # Build conversation history with system prompt
+    conversation_parts = [system_prompt + "\n\n"]
+    
+    for msg in messages:
+        if msg.role == "user":
+            conversation_parts.append(f"User: {msg.content}")
+        elif msg.role == "assistant":
+            conversation_parts.append(f"Assistant: {msg.content}")
+    
+    return "\n\n".join(conversation_parts)
+
+
+class LLMProvider(ABC):
+    """
+    One LLM backend with its model and request timeout.
+    
+    Subclasses accept max_retries to override the SDK's own retries where
+    the SDK has them (AIService disables them and retries itself).
+    
+    SDKs are imported and clients built on first use of client, not at
+    construction: the SDK imports dominate backend startup, and fallback
+    providers may never be called.
+    """
+    
+    name: str = ""
+    
+    def __init__(self, model: str, timeout_seconds: float):
+        self.model = model
+        self.timeout_seconds = timeout_seconds
+        self._client: Any = None
+    
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+    
+    def _create_client(self) -> Any:
+        """Import the SDK and build its client (providers without one return themselves)."""
+        return self
+    
+    @abstractmethod
+    async def complete(self, system_prompt: str, messages: List[Message]) -> str:
+        """Return the whole reply."""
+    
+    @abstractmethod
+    def stream(self, system_prompt: str, messages: List[Message]) -> AsyncIterator[str]:
+        """Yield the reply as text chunks."""
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+    
+    def __init__(self, max_retries: Optional[int] = None):
+        if not settings.openai_api_key:
+            raise ValueError("OpenAI API key is not set. Please check your .env file.")
+        super().__init__(settings.openai_model, settings.openai_timeout_seconds)
+        self._retry_options = {} if max_retries is None else {"max_retries": max_retries}
+    
+    def _create_client(self) -> Any:
+        from openai import AsyncOpenAI
+        
+        return AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url or None,
+            **self._retry_options
+        )
+    
+    async def complete(self, system_prompt: str, messages: List[Message]) -> str:
+        """Get response from OpenAI."""
+        
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=format_chat_messages(system_prompt, messages),
+                temperature=0.7,
+                max_tokens=MAX_OUTPUT_TOKENS
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"[AI Service] OpenAI Error: {str(e)}")
+            raise
+    
+    async def stream(self, system_prompt: str, messages: List[Message]) -> AsyncIterator[str]:
+        """Stream response tokens from OpenAI."""
+        
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=format_chat_messages(system_prompt, messages),
+                temperature=0.7,
+                max_tokens=MAX_OUTPUT_TOKENS,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"[AI Service] OpenAI Error: {str(e)}")
+            raise
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+    
+    def __init__(self, max_retries: Optional[int] = None):
+        if not settings.gemini_api_key:
+            raise ValueError("Gemini API key is not set. Please check your .env file.")
+        super().__init__(settings.gemini_model, settings.gemini_timeout_seconds)
+    
+    def _create_client(self) -> Any:
+        from google import genai
+        from google.genai import types
+        
+        return genai.Client(
+            api_key=settings.gemini_api_key,
+            http_options=types.HttpOptions(base_url=settings.gemini_base_url or None)
+        )
+    
+    async def complete(self, system_prompt: str, messages: List[Message]) -> str:
+        """Get response from Google Gemini."""
+        
+        client = self.client
+        from google.genai import types
+        
+        try:
+            # Generate response
+            response = await client.aio.models.generate_content(
+                model=self.model,
+                contents=format_gemini_prompt(system_prompt, messages),
+                config=types.GenerateContentConfig(
+                    temperature=0.7,
+                    max_output_tokens=MAX_OUTPUT_TOKENS,
+                )
+            )
+            return response.text
+        except Exception as e:
+            print(f"[AI Service] Gemini Error: {str(e)}")
+            raise
+    
+    async def stream(self, system_prompt: str, messages: List[Message]) -> AsyncIterator[str]:
+        """Stream response text from Google Gemini."""
+        
+        client = self.client
+        from google.genai import types
+        
+        try:
+            stream = await client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=format_gemini_prompt(system_prompt, messages),
+                config=types.GenerateContentConfig(
+                    temperature=0.7,
+                    max_output_tokens=MAX_OUTPUT_TOKENS,
+                )
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            print(f"[AI Service] Gemini Error: {str(e)}")
+            raise
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+    
+    def __init__(self, max_retries: Optional[int] = None):
+        if not settings.groq_api_key:
+            raise ValueError("Groq API key is not set. Please check your .env file.")
+        super().__init__(settings.groq_model, settings.groq_timeout_seconds)
+        self._retry_options = {} if max_retries is None else {"max_retries": max_retries}
+    
+    def _create_client(self) -> Any:
+        from groq import AsyncGroq
+        
+        return AsyncGroq(
+            api_key=settings.groq_api_key,
+            base_url=settings.groq_base_url or None,
+            **self._retry_options
+        )
+    
+    async def complete(self, system_prompt: str, messages: List[Message]) -> str:
+        """Get response from Groq."""
+        
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=format_chat_messages(system_prompt, messages),
+                temperature=0.7,
+                max_tokens=MAX_OUTPUT_TOKENS
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"[AI Service] Groq Error: {str(e)}")
+            raise
+    
+    async def stream(self, system_prompt: str, messages: List[Message]) -> AsyncIterator[str]:
+        """Stream response tokens from Groq."""
+        
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=format_chat_messages(system_prompt, messages),
+                temperature=0.7,
+                max_tokens=MAX_OUTPUT_TOKENS,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            print(f"[AI Service] Groq Error: {str(e)}")
+            raise
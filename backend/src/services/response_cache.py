@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.config.settings import settings
+from src.services.lru_cache import LRUCache
+
+
+# Lines of the system prompt that only personalise wording, not the content asked for
+_NAME_LINE = re.compile(r"^- Name:.*$", re.MULTILINE)
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?]+$")
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different prompts share a key."""
+    return " ".join(text.split()).casefold()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of tutor replies for repeatable prompts.
+    
+    Replies are keyed on the normalized system prompt (without the student's
+    name), teaching mode, level and the last user message. An in-process LRU
+    sits in front of a directory of small JSON files that survives restarts;
+    both tiers expire entries after the same TTL. Only modes listed in
+    settings.response_cache_modes are cached.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        modes: Optional[List[str]] = None
+    ):
+        self.enabled = settings.response_cache_enabled if enabled is None else enabled
+        self.modes = set(settings.response_cache_modes if modes is None else modes)
+        self.ttl_seconds = settings.response_cache_ttl_seconds
+        self.disk_max_entries = settings.response_cache_disk_max_entries
+        self.cache_dir = Path(cache_dir or Path(settings.data_dir) / "response_cache")
+        
+        self._memory = LRUCache(
+            max_size=settings.response_cache_size,
+            ttl_seconds=self.ttl_seconds
+        )
+        self._lock = threading.Lock()
+        self._disk_entries: Optional[int] = None
+        self.disk_hits = 0
+        self.mode_stats: Dict[str, Dict[str, int]] = {}
+        
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def applies_to(self, teaching_mode: Optional[str]) -> bool:
+        """Whether replies in this teaching mode may be cached."""
+        return self.enabled and teaching_mode in self.modes
+    
+    def make_key(self, system_prompt: str, teaching_mode: str, level: str, user_message: str) -> str:
+        """Hash the normalized prompt parts into a cache key."""
+        parts = [
+            normalize_text(_NAME_LINE.sub("", system_prompt)),
+            teaching_mode,
+            level.upper(),
+            _TRAILING_PUNCTUATION.sub("", normalize_text(user_message)),
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+    
+    def _record(self, teaching_mode: str, outcome: str) -> None:
+        with self._lock:
+            counts = self.mode_stats.setdefault(teaching_mode, {"hits": 0, "misses": 0})
+            counts[outcome] += 1
+    
+    def get(self, key: str, teaching_mode: str) -> Optional[str]:
+        """Return a cached reply from memory, falling back to disk."""
+        response = self._memory.get(key)
+        if response is None:
+            response = self._read_disk(key)
+            if response is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._memory.put(key, response)
+        
+        self._record(teaching_mode, "misses" if response is None else "hits")
+        return response
+    
+    def put(self, key: str, teaching_mode: str, response: str) -> None:
+        """Store a reply in both tiers."""
+        if not response:
+            return
+        self._memory.put(key, response)
+        self._write_disk(key, teaching_mode, response)
+    
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            return None
+        return entry["response"]
+    
+    def _write_disk(self, key: str, teaching_mode: str, response: str) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"created_at": time.time(), "teaching_mode": teaching_mode, "response": response},
+                f, ensure_ascii=False
+            )
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            if self._disk_entries is None:
+                self._disk_entries = sum(1 for _ in self.cache_dir.glob("*.json"))
+            else:
+                self._disk_entries += 1
+            prune = self._disk_entries > self.disk_max_entries
+        if prune:
+            self._prune_disk()
+    
+    def _prune_disk(self) -> None:
+        """Drop the oldest files so the disk tier shrinks to 90% of its cap."""
+        files = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        excess = len(files) - int(self.disk_max_entries * 0.9)
+        for path in files[:max(0, excess)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._disk_entries = len(files) - max(0, excess)
+    
+    def stats(self) -> Dict:
+        """Hit rates overall and per teaching mode."""
+        with self._lock:
+            per_mode = {
+                mode: dict(
+                    counts,
+                    hit_rate=round(counts["hits"] / (counts["hits"] + counts["misses"]), 4)
+                )
+                for mode, counts in self.mode_stats.items()
+            }
+            hits = sum(c["hits"] for c in self.mode_stats.values())
+            lookups = hits + sum(c["misses"] for c in self.mode_stats.values())
+            disk_hits = self.disk_hits
+        
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "disk_hits": disk_hits,
+            "memory": self._memory.stats(),
+            "modes": per_mode,
+        }
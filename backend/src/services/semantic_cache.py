@@ -0,0 +1,220 @@
+import hashlib
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from src.config.settings import settings
+
+# Imported by load_numpy() when a semantic cache is enabled, to keep startup light
+np = None
+
+
+def load_numpy() -> bool:
+    """Import NumPy on first need; False when it is not installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # The semantic cache is optional; without NumPy it stays disabled
+            return False
+        np = numpy
+    return True
+
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Filler words that carry no topic; dropping them lets "das vs dass?" match
+# "what is the difference between dass and das"
+STOPWORDS = frozenset("""
+a an the is are am be of to in on for and or vs versus instead what whats which when how
+do does can could would you me i my please tell explain give show difference between
+mean means meaning use using lea hi hello hallo bitte und oder ist
+""".split())
+
+
+# Words that flip a question's meaning while barely changing its embedding;
+# "n't" contractions are read as "not"
+NEGATIONS = frozenset("""
+not no never none nothing nobody nicht kein keine keinen keinem keiner keines nie niemals nichts
+""".split())
+_CONTRACTION_PATTERN = re.compile(r"n['’]t\b")
+
+
+def guard_key(text: str) -> int:
+    """
+    Hash of the numbers and negation words in a question (0 if it has none).
+    
+    "Give me 5 questions" and "give me 10 questions", or "I am hungry" and
+    "I am not hungry", embed close together but need different answers, so
+    a cached answer is only reused when these match exactly.
+    """
+    words = _WORD_PATTERN.findall(_CONTRACTION_PATTERN.sub(" not", text.casefold()))
+    guards = sorted(str(int(w)) if w.isdecimal() else w for w in words if w.isdecimal() or w in NEGATIONS)
+    if not guards:
+        return 0
+    return int.from_bytes(hashlib.blake2b(" ".join(guards).encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _tokens(text: str) -> List[str]:
+    words = _WORD_PATTERN.findall(_CONTRACTION_PATTERN.sub(" not", text.casefold()))
+    content = [w for w in words if w not in STOPWORDS]
+    return content or words
+
+
+def embed(text: str, dim: int) -> "np.ndarray":
+    """
+    Embed a question as a unit vector of hashed character n-grams.
+    
+    Each content word contributes its 3- to 5-grams (with boundary markers)
+    and the whole word, hashed into dim buckets with a random sign. Runs
+    locally in microseconds; similar spellings and word orders land close.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in _tokens(text):
+        padded = f"<{word}>"
+        grams = [padded] + [
+            padded[i:i + n] for n in (3, 4, 5) for i in range(len(padded) - n + 1)
+        ]
+        for gram in grams:
+            h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % dim] += 1.0 if (h >> 63) else -1.0
+    
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticIndex:
+    """Dense vector index for one (level, mode) partition, bounded as a ring buffer."""
+    
+    def __init__(self, dim: int, max_entries: int):
+        self.dim = dim
+        self.max_entries = max_entries
+        self._vectors = np.zeros((min(1024, max_entries), dim), dtype=np.float32)
+        self._guards = np.zeros(len(self._vectors), dtype=np.int64)  # guard_key() per entry
+        self._answers: List[str] = []
+        self._next = 0  # Slot overwritten next once the index is full
+    
+    def __len__(self) -> int:
+        return len(self._answers)
+    
+    def add(self, vector: "np.ndarray", guard: int, answer: str) -> None:
+        if len(self._answers) < self.max_entries:
+            if len(self._answers) == len(self._vectors):
+                size = min(len(self._vectors) * 2, self.max_entries)
+                grown = np.zeros((size, self.dim), dtype=np.float32)
+                grown[:len(self._vectors)] = self._vectors
+                self._vectors = grown
+                self._guards = np.resize(self._guards, size)
+            self._vectors[len(self._answers)] = vector
+            self._guards[len(self._answers)] = guard
+            self._answers.append(answer)
+        else:
+            # Full: replace the oldest entry
+            self._vectors[self._next] = vector
+            self._guards[self._next] = guard
+            self._answers[self._next] = answer
+            self._next = (self._next + 1) % self.max_entries
+    
+    def snapshot(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Views of the stored vectors and guard keys, to search without the
+        cache lock. Growing replaces the arrays and appending writes past
+        the views, so only slots overwritten once the index is full can
+        change under them; answer() rechecks the chosen slot.
+        """
+        count = len(self._answers)
+        return self._vectors[:count], self._guards[:count]
+    
+    def answer(self, slot: int, vector: "np.ndarray", guard: int) -> Tuple[Optional[str], float]:
+        """The answer in a slot and its cosine similarity, if the slot still has this guard key."""
+        if self._guards[slot] != guard:
+            return None, 0.0
+        return self._answers[slot], float(self._vectors[slot] @ vector)
+
+
+def nearest(vectors: "np.ndarray", guards: "np.ndarray", vector: "np.ndarray", guard: int) -> Optional[int]:
+    """Slot of the most similar vector with the same guard key, if any."""
+    if not len(vectors):
+        return None
+    scores = np.where(guards == guard, vectors @ vector, -np.inf)
+    best = int(np.argmax(scores))
+    return None if scores[best] == -np.inf else best
+
+
+class SemanticCache:
+    """
+    Cache of tutor replies matched by question similarity instead of exact text.
+    
+    Questions are embedded locally (see embed) into one index per level and
+    teaching mode. A lookup returns the stored answer of the nearest question
+    with the same numbers and negations (see guard_key) when its cosine
+    similarity reaches the threshold.
+    """
+    
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        modes: Optional[List[str]] = None,
+        threshold: Optional[float] = None
+    ):
+        enabled = settings.semantic_cache_enabled if enabled is None else enabled
+        if enabled and not load_numpy():
+            print("[Semantic Cache] NumPy is not installed; semantic cache disabled.")
+            enabled = False
+        self.enabled = enabled
+        self.modes = set(settings.semantic_cache_modes if modes is None else modes)
+        self.threshold = settings.semantic_cache_threshold if threshold is None else threshold
+        self.dim = settings.semantic_cache_dim
+        self.max_entries = settings.semantic_cache_max_entries
+        
+        self._indexes: Dict[Tuple[str, str], SemanticIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def applies_to(self, teaching_mode: Optional[str]) -> bool:
+        """Whether replies in this teaching mode may be cached."""
+        return self.enabled and teaching_mode in self.modes
+    
+    def lookup(self, level: str, teaching_mode: str, question: str) -> Optional[str]:
+        """Return the answer to a sufficiently similar earlier question, if any."""
+        vector = embed(question, self.dim)
+        guard = guard_key(question)
+        with self._lock:
+            index = self._indexes.get((level.upper(), teaching_mode))
+            vectors, guards = index.snapshot() if index else (None, None)
+        
+        # The matmul runs unlocked so concurrent lookups and stores don't queue behind it
+        slot = nearest(vectors, guards, vector, guard) if index else None
+        with self._lock:
+            answer, score = index.answer(slot, vector, guard) if slot is not None else (None, 0.0)
+            if answer is not None and score >= self.threshold:
+                self.hits += 1
+                return answer
+            self.misses += 1
+            return None
+    
+    def store(self, level: str, teaching_mode: str, question: str, answer: str) -> None:
+        """Index a question with the answer it received."""
+        vector = embed(question, self.dim)
+        if not vector.any():
+            return
+        with self._lock:
+            key = (level.upper(), teaching_mode)
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = SemanticIndex(self.dim, self.max_entries)
+            index.add(vector, guard_key(question), answer)
+    
+    def stats(self) -> Dict:
+        """Hit rate and index sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": sum(len(index) for index in self._indexes.values()),
+                "indexes": len(self._indexes),
+            }
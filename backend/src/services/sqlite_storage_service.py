@@ -0,0 +1,299 @@
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple
+from src.models.schemas import StudentProfile, ChatSession, Message, MessagePage, SessionSummary
+from src.config.settings import settings
+from src.services.storage_codec import decode, encode
+from src.services.storage_service import (
+    EmailTakenError, ProfileConflictError, SessionConflictError, StorageService, message_page, message_window,
+    session_preview
+)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    student_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    teaching_mode TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    preview TEXT,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_student ON sessions (student_id, created_at);
+
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStorageService(StorageService):
+    """Storage backend using a single SQLite database in WAL mode."""
+    
+    def __init__(self, db_path: Optional[str] = None):
+        super().__init__()
+        self.db_path = Path(db_path or settings.sqlite_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        
+        # Databases created before these session columns existed
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        for column, definition in (("version", "INTEGER NOT NULL DEFAULT 0"), ("preview", "TEXT")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {definition}")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_student_updated "
+            "ON sessions (student_id, updated_at, session_id)"
+        )
+        
+        # Emails are unique, so concurrent signups cannot register one twice.
+        # Databases that already hold duplicates keep the plain lookup index.
+        try:
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_profiles_email_unique ON profiles (email)")
+            conn.execute("DROP INDEX IF EXISTS idx_profiles_email")
+        except sqlite3.IntegrityError:
+            print("[Storage] Some profiles share an email; email uniqueness is not enforced until they are merged")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_profiles_email ON profiles (email)")
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            # NORMAL does not fsync WAL commits; stricter durability levels do
+            conn.execute("PRAGMA synchronous=NORMAL" if self.durability == "sync" else "PRAGMA synchronous=FULL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+    
+    def _dumps(self, data: Dict) -> str:
+        return encode(data).decode("utf-8")
+    
+    def _write_profile(self, profile: StudentProfile, expected_updated_at: Optional[datetime]) -> str:
+        """Save student profile, keeping the email column lowercased and unique."""
+        try:
+            self._upsert_profile(profile, expected_updated_at)
+        except sqlite3.IntegrityError:
+            raise EmailTakenError(f"Another profile already uses the email {profile.email}") from None
+        # The stamp is the stored updated_at column
+        return profile.updated_at.isoformat()
+    
+    def _upsert_profile(self, profile: StudentProfile, expected_updated_at: Optional[datetime]) -> None:
+        with self._connection() as conn:
+            if expected_updated_at is not None:
+                # Take the write lock up front so the updated_at check and write are atomic
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT updated_at FROM profiles WHERE student_id = ?", (profile.student_id,)
+                ).fetchone()
+                if row is None or datetime.fromisoformat(row[0]) != expected_updated_at:
+                    raise ProfileConflictError(f"Profile {profile.student_id} was updated by another request")
+            
+            conn.execute(
+                """
+                INSERT INTO profiles (student_id, email, updated_at, data)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (student_id) DO UPDATE SET
+                    email = excluded.email,
+                    updated_at = excluded.updated_at,
+                    data = excluded.data
+                """,
+                (
+                    profile.student_id,
+                    profile.email.lower(),
+                    profile.updated_at.isoformat(),
+                    self._dumps(profile.model_dump()),
+                ),
+            )
+    
+    def _read_profile(self, student_id: str) -> Optional[StudentProfile]:
+        """Retrieve student profile by ID."""
+        row = self._connection().execute(
+            "SELECT data FROM profiles WHERE student_id = ?", (student_id,)
+        ).fetchone()
+        return StudentProfile.model_validate(decode(row[0])) if row else None
+    
+    def _profile_stamp(self, student_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT updated_at FROM profiles WHERE student_id = ?", (student_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def _find_student_id_by_email(self, email: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT student_id FROM profiles WHERE email = ? LIMIT 1", (email.lower(),)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def _write_session(self, session: ChatSession, expected_version: int) -> Tuple[str, int]:
+        """Save session metadata and insert only messages not stored yet."""
+        with self._connection() as conn:
+            # Take the write lock up front so the version check and write are atomic
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT message_count, version FROM sessions WHERE session_id = ?",
+                (session.session_id,),
+            ).fetchone()
+            stored_count, stored_version = row if row else (0, 0)
+            if stored_version != expected_version:
+                raise SessionConflictError(
+                    f"Session {session.session_id} was saved by another request "
+                    f"(stored version {stored_version}, expected {expected_version})"
+                )
+            
+            conn.execute(
+                """
+                INSERT INTO sessions (
+                    session_id, student_id, teaching_mode, created_at,
+                    updated_at, message_count, version, preview, meta
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    teaching_mode = excluded.teaching_mode,
+                    updated_at = excluded.updated_at,
+                    message_count = excluded.message_count,
+                    version = excluded.version,
+                    preview = excluded.preview,
+                    meta = excluded.meta
+                """,
+                (
+                    session.session_id,
+                    session.student_id,
+                    session.teaching_mode,
+                    session.created_at.isoformat(),
+                    # Fixed width so the column sorts chronologically as text
+                    session.updated_at.isoformat(timespec="microseconds"),
+                    len(session.messages),
+                    session.version,
+                    session_preview(session),
+                    self._dumps(session.model_dump(exclude={"messages"})),
+                ),
+            )
+            
+            if stored_count > len(session.messages):
+                conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq >= ?",
+                    (session.session_id, len(session.messages)),
+                )
+                stored_count = len(session.messages)
+            
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, data) VALUES (?, ?, ?)",
+                [
+                    (session.session_id, seq, self._dumps(message.model_dump()))
+                    for seq, message in enumerate(session.messages[stored_count:], stored_count)
+                ],
+            )
+        return (session.updated_at.isoformat(timespec="microseconds"), session.version)
+    
+    def _load_messages(self, session_id: str) -> List[Dict]:
+        """Decoded message rows, left for ChatSession to validate in one pass."""
+        rows = self._connection().execute(
+            "SELECT data FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [decode(data) for (data,) in rows]
+    
+    def _session_stamp(self, session_id: str) -> Optional[Tuple[str, int]]:
+        row = self._connection().execute(
+            "SELECT updated_at, version FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        return tuple(row) if row else None
+    
+    def _read_session(self, session_id: str) -> Optional[ChatSession]:
+        """Retrieve chat session with its messages."""
+        row = self._connection().execute(
+            "SELECT meta FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if not row:
+            return None
+        
+        return ChatSession.model_validate({**decode(row[0]), "messages": self._load_messages(session_id)})
+    
+    def _read_messages(
+        self,
+        session_id: str,
+        before: Optional[int],
+        after: Optional[int],
+        limit: int
+    ) -> Optional[MessagePage]:
+        """Read only the requested seq range, using the messages primary key."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT student_id, message_count FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if not row:
+            return None
+        
+        student_id, total = row
+        start, stop = message_window(total, before, after, limit)
+        rows = conn.execute(
+            "SELECT data FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+            (session_id, start, stop),
+        ).fetchall()
+        return message_page(session_id, student_id, [Message.model_validate(decode(data)) for (data,) in rows], start, total)
+    
+    def _read_session_meta(self, session_id: str, student_id: Optional[str] = None) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT meta FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return decode(row[0]) if row else None
+    
+    def _read_session_summaries(
+        self,
+        student_id: str,
+        limit: int,
+        after: Optional[Tuple[datetime, str]],
+        descending: bool
+    ) -> List[SessionSummary]:
+        """Summaries from the sessions table, paged on the (student_id, updated_at) index."""
+        direction, comparison = ("DESC", "<") if descending else ("ASC", ">")
+        query = """
+            SELECT session_id, teaching_mode, created_at, updated_at, message_count, preview
+            FROM sessions WHERE student_id = ?
+        """
+        params: list = [student_id]
+        if after is not None:
+            query += f" AND (updated_at, session_id) {comparison} (?, ?)"
+            params += [after[0].isoformat(timespec="microseconds"), after[1]]
+        query += f" ORDER BY updated_at {direction}, session_id {direction} LIMIT ?"
+        params.append(limit)
+        
+        columns = ("session_id", "teaching_mode", "created_at", "updated_at", "message_count", "preview")
+        return [
+            SessionSummary(**dict(zip(columns, row)))
+            for row in self._connection().execute(query, params).fetchall()
+        ]
+    
+    def _read_student_sessions(self, student_id: str) -> List[ChatSession]:
+        """Get all sessions for a student using the student_id index."""
+        rows = self._connection().execute(
+            "SELECT session_id, meta FROM sessions WHERE student_id = ? ORDER BY created_at DESC",
+            (student_id,),
+        ).fetchall()
+        
+        return [
+            ChatSession.model_validate({**decode(meta), "messages": self._load_messages(session_id)})
+            for session_id, meta in rows
+        ]
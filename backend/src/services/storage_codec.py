@@ -0,0 +1,45 @@
+"""
+Encoding of stored profiles, sessions and session log records.
+
+Records are written as compact JSON, by orjson when it is installed (it
+serializes datetimes natively) and by the json module otherwise. With
+settings.storage_codec == "pretty" documents are indented instead. Both
+formats, and files written before either existed, decode the same way.
+"""
+import json
+from datetime import datetime
+from typing import Any, Union
+from src.config.settings import settings
+
+try:
+    import orjson
+except ImportError:  # Optional; the json module writes the same format, more slowly
+    orjson = None
+
+
+def _default(obj: Any) -> str:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def encode(data: Any, document: bool = False) -> bytes:
+    """
+    Serialize stored data to UTF-8 JSON.
+    
+    Only whole-file documents (document=True) are indented under the
+    "pretty" codec; session log records and SQLite columns stay on one line.
+    """
+    pretty = document and settings.storage_codec == "pretty"
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2, default=_default).encode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def decode(raw: Union[bytes, str]) -> Any:
+    """Parse a stored document or record in any of the formats encode() writes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
@@ -1,23 +1,218 @@
+import asyncio
+import atexit
+import hashlib
 import json
 import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple, Iterator, Hashable, Callable, TypeVar, BinaryIO
 from datetime import datetime
-from src.models.schemas import StudentProfile, ChatSession, Message
+from src.models.schemas import StudentProfile, ChatSession, Message, MessagePage, SessionSummary
 from src.config.settings import settings
+from src.services.lru_cache import LRUCache
+from src.services.storage_codec import decode, encode
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
-class StorageService:
-    """Service for storing and retrieving data from JSON files."""
+
+T = TypeVar("T")
+
+# Characters of the latest message shown in session summaries
+PREVIEW_LENGTH = 100
+
+# File suffixes of each kind of record stored by the JSON backend
+RECORD_SUFFIXES = {"profiles": (".json",), "sessions": (".jsonl", ".json")}
+
+# Start of every message line in a session log (see JSONStorageService._log_record),
+# as written by the storage codec and by the json module before it existed
+MESSAGE_RECORD_PREFIXES = (b'{"type":"message"', b'{"type": "message"')
+
+# Lock files per kind of record under <data_dir>/locks; records whose ids
+# hash to the same stripe share a lock (see JSONStorageService._stripe_lock)
+LOCK_STRIPES = 256
+
+
+class SessionConflictError(Exception):
+    """The session was saved by another request after this copy was loaded."""
+
+
+class ProfileConflictError(Exception):
+    """The profile was saved by another request after the expected update."""
+
+
+class EmailTakenError(Exception):
+    """Another profile is already registered with the email address."""
+
+
+def session_preview(session: ChatSession) -> Optional[str]:
+    """Start of the session's latest message, on one line."""
+    if not session.messages:
+        return None
+    text = " ".join(session.messages[-1].content.split())
+    return text if len(text) <= PREVIEW_LENGTH else text[:PREVIEW_LENGTH - 1] + "…"
+
+
+def session_summary(session: ChatSession) -> SessionSummary:
+    return SessionSummary(
+        session_id=session.session_id,
+        teaching_mode=session.teaching_mode,
+        created_at=session.created_at,
+        updated_at=session.updated_at,
+        message_count=len(session.messages),
+        preview=session_preview(session)
+    )
+
+
+def _summary_key(summary: SessionSummary) -> Tuple[datetime, str]:
+    return (summary.updated_at, summary.session_id)
+
+
+def _page_after(
+    summaries: List[SessionSummary],
+    after: Optional[Tuple[datetime, str]],
+    descending: bool
+) -> List[SessionSummary]:
+    """Keep the summaries that sort after the cursor key."""
+    if after is None:
+        return summaries
+    if descending:
+        return [s for s in summaries if _summary_key(s) < after]
+    return [s for s in summaries if _summary_key(s) > after]
+
+
+def message_window(total: int, before: Optional[int], after: Optional[int], limit: int) -> Tuple[int, int]:
+    """
+    [start, stop) positions of up to limit messages out of total.
+    
+    after returns the messages following that position, before the ones
+    preceding it; without either the window is the end of the session.
+    """
+    if after is not None:
+        start = max(0, after + 1)
+        return min(start, total), min(total, start + limit)
+    stop = total if before is None else max(0, min(before, total))
+    return max(0, stop - limit), stop
+
+
+def message_page(
+    session_id: str,
+    student_id: str,
+    messages: List[Message],
+    start: int,
+    total: int
+) -> MessagePage:
+    """Wrap a window of messages with the cursors around it."""
+    stop = start + len(messages)
+    return MessagePage(
+        session_id=session_id,
+        student_id=student_id,
+        messages=messages,
+        start=start,
+        total=total,
+        earlier_cursor=start if start > 0 else None,
+        later_cursor=stop - 1 if stop < total else None
+    )
+
+
+def _session_message_page(
+    session: ChatSession,
+    before: Optional[int],
+    after: Optional[int],
+    limit: int
+) -> MessagePage:
+    total = len(session.messages)
+    start, stop = message_window(total, before, after, limit)
+    return message_page(
+        session.session_id,
+        session.student_id,
+        [message.model_copy() for message in session.messages[start:stop]],
+        start,
+        total
+    )
+
+
+@contextmanager
+def _exclusive_file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on path, shared by all threads and processes."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class StorageService(ABC):
+    """
+    Interface for storing and retrieving profiles and chat sessions.
+    
+    Backends implement the _read_*/_write_* primitives; this class adds a
+    bounded LRU cache in front of them. Cached entries are validated against
+    a cheap per-object stamp (file mtime or stored version), so edits made
+    outside this process are never served stale.
+    
+    The a*-prefixed coroutines run the same operations on a bounded thread
+    pool so async routes never block the event loop on disk I/O.
+    
+    With settings.session_durability == "write_behind", save_session only
+    commits the session in memory; reads see the committed copy at once and
+    a writer thread persists it every session_flush_interval_ms. A flush
+    that finds the session saved by another worker adds its new messages on
+    top of the stored copy. close() (run on shutdown and at exit) flushes
+    everything still pending.
+    """
     
     def __init__(self):
-        self.data_dir = Path(settings.data_dir)
-        self.profiles_dir = self.data_dir / "profiles"
-        self.sessions_dir = self.data_dir / "sessions"
+        self._profile_cache = LRUCache(
+            max_size=settings.storage_cache_size,
+            ttl_seconds=settings.storage_cache_ttl_seconds
+        )
+        self._session_cache = LRUCache(
+            max_size=settings.storage_cache_size,
+            ttl_seconds=settings.storage_cache_ttl_seconds
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.storage_io_workers,
+            thread_name_prefix="storage-io"
+        )
         
-        # Create directories if they don't exist
-        self.profiles_dir.mkdir(parents=True, exist_ok=True)
-        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.durability = settings.session_durability
+        # session_id -> (latest committed copy, version stored on disk) awaiting a flush
+        self._pending: Dict[str, Tuple[ChatSession, int]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_writer = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self.commits = 0
+        self.flushes = 0
+        self.flushed_sessions = 0
+        self.flush_merges = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        
+        if self.durability == "write_behind":
+            self._writer = threading.Thread(
+                target=self._write_behind_loop, name="storage-writer", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.close)
     
     def _json_serializer(self, obj):
         """Custom JSON serializer for datetime objects."""
@@ -25,64 +220,1171 @@ class StorageService:
             return obj.isoformat()
         raise TypeError(f"Type {type(obj)} not serializable")
     
-    def save_profile(self, profile: StudentProfile) -> None:
-        """Save student profile to JSON file."""
-        profile_path = self.profiles_dir / f"{profile.student_id}.json"
-        profile.updated_at = datetime.utcnow()
+    @abstractmethod
+    def _write_profile(self, profile: StudentProfile, expected_updated_at: Optional[datetime]) -> Hashable:
+        """
+        Persist a student profile and return its new stamp, taken before
+        any other writer could change it.
         
-        with open(profile_path, 'w', encoding='utf-8') as f:
-            json.dump(profile.model_dump(), f, indent=2, default=self._json_serializer)
+        Unless expected_updated_at is None, must atomically check that the
+        stored profile was last saved at that time and raise
+        ProfileConflictError without writing anything if it was not.
+        """
     
-    def get_profile(self, student_id: str) -> Optional[StudentProfile]:
-        """Retrieve student profile from JSON file."""
-        profile_path = self.profiles_dir / f"{student_id}.json"
+    @abstractmethod
+    def _read_profile(self, student_id: str) -> Optional[StudentProfile]:
+        """Load a student profile from the backend."""
+    
+    @abstractmethod
+    def _profile_stamp(self, student_id: str) -> Optional[Hashable]:
+        """Cheap value that changes whenever the stored profile changes."""
+    
+    @abstractmethod
+    def _find_student_id_by_email(self, email: str) -> Optional[str]:
+        """Look up the student_id registered for an email address."""
+    
+    @abstractmethod
+    def _write_session(self, session: ChatSession, expected_version: int) -> Hashable:
+        """
+        Persist a chat session, including any new messages, and return its
+        new stamp, taken before any other writer could change it.
         
-        if not profile_path.exists():
+        Must atomically check that the stored session is still at
+        expected_version (0 for a session not stored yet) and raise
+        SessionConflictError without writing anything if it is not.
+        """
+    
+    @abstractmethod
+    def _read_session(self, session_id: str) -> Optional[ChatSession]:
+        """Load a chat session with all of its messages from the backend."""
+    
+    @abstractmethod
+    def _read_session_meta(self, session_id: str, student_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Load a stored session's fields except messages, without decoding them
+        where possible. student_id is the owner the caller expects; backends
+        may use it to find the fields more cheaply.
+        """
+    
+    @abstractmethod
+    def _session_stamp(self, session_id: str) -> Optional[Hashable]:
+        """Cheap value that changes whenever the stored session changes."""
+    
+    @abstractmethod
+    def _read_student_sessions(self, student_id: str) -> List[ChatSession]:
+        """Load all stored sessions of a student, in any order."""
+    
+    @abstractmethod
+    def _read_session_summaries(
+        self,
+        student_id: str,
+        limit: int,
+        after: Optional[Tuple[datetime, str]],
+        descending: bool
+    ) -> List[SessionSummary]:
+        """
+        Up to limit summaries of a student's stored sessions, ordered by
+        (updated_at, session_id) and starting after the given key, read
+        from stored metadata without loading any messages.
+        """
+    
+    @abstractmethod
+    def _read_messages(
+        self,
+        session_id: str,
+        before: Optional[int],
+        after: Optional[int],
+        limit: int
+    ) -> Optional[MessagePage]:
+        """
+        The stored session's messages in message_window(), decoding as
+        little of the rest of the history as the format allows.
+        """
+    
+    def save_profile(self, profile: StudentProfile, expected_updated_at: Optional[datetime] = None) -> None:
+        """
+        Create or update a student profile.
+        
+        With expected_updated_at, the save only succeeds if the stored profile
+        was last saved at that time; otherwise it raises ProfileConflictError.
+        """
+        previous_updated_at = profile.updated_at
+        profile.updated_at = datetime.utcnow()
+        self._profile_cache.invalidate(profile.student_id)
+        try:
+            stamp = self._write_profile(profile, expected_updated_at)
+        except BaseException:
+            profile.updated_at = previous_updated_at
+            raise
+        # Write-through: the caller keeps its object, so the cache gets a copy
+        self._profile_cache.put(profile.student_id, profile.model_copy(deep=True), stamp)
+    
+    def get_profile(self, student_id: str) -> Optional[StudentProfile]:
+        """Retrieve a student profile by ID, serving repeat reads from the cache."""
+        stamp = self._profile_stamp(student_id)
+        if stamp is None:
+            self._profile_cache.invalidate(student_id)
             return None
         
-        with open(profile_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return StudentProfile(**data)
+        profile = self._profile_cache.get(student_id, stamp)
+        if profile is None:
+            profile = self._read_profile(student_id)
+            if profile is None:
+                return None
+            self._profile_cache.put(student_id, profile, stamp)
+        
+        # Callers mutate what they get back, so never hand out the cached object.
+        return profile.model_copy(deep=True)
     
     def get_profile_by_email(self, email: str) -> Optional[StudentProfile]:
-        """Retrieve student profile by email address."""
-        for profile_file in self.profiles_dir.glob("*.json"):
-            with open(profile_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if data.get('email', '').lower() == email.lower():
-                    return StudentProfile(**data)
+        """Retrieve a student profile by email address (case-insensitive)."""
+        student_id = self._find_student_id_by_email(email)
+        if student_id is None:
+            return None
+        
+        profile = self.get_profile(student_id)
+        if profile is not None and profile.email.lower() == email.lower():
+            return profile
         return None
     
     def save_session(self, session: ChatSession) -> None:
-        """Save chat session to JSON file."""
-        session_path = self.sessions_dir / f"{session.session_id}.json"
+        """
+        Create or update a chat session, including any new messages.
+        
+        Optimistic: the save only succeeds if nobody saved the session since
+        this copy was loaded, and bumps session.version. Otherwise it raises
+        SessionConflictError and leaves the stored session untouched.
+        """
         session.updated_at = datetime.utcnow()
+        self._session_cache.invalidate(session.session_id)
+        if self.durability == "write_behind":
+            self._commit_session(session)
+            return
         
-        with open(session_path, 'w', encoding='utf-8') as f:
-            json.dump(session.model_dump(), f, indent=2, default=self._json_serializer)
+        expected_version = session.version
+        session.version += 1
+        try:
+            stamp = self._write_session(session, expected_version)
+        except BaseException:
+            session.version = expected_version
+            raise
+        self._cache_written_session(session, stamp)
+    
+    def _cache_written_session(self, session: ChatSession, stamp: Hashable) -> None:
+        """Write-through: cache a copy of a session just written under its new stamp."""
+        # Stored messages are never edited, so the copy can share them
+        self._session_cache.put(
+            session.session_id, session.model_copy(update={"messages": list(session.messages)}), stamp
+        )
     
     def get_session(self, session_id: str) -> Optional[ChatSession]:
-        """Retrieve chat session from JSON file."""
-        session_path = self.sessions_dir / f"{session_id}.json"
+        """Retrieve a chat session, serving repeat reads from the cache."""
+        with self._pending_lock:
+            pending = self._pending.get(session_id)
+        if pending is not None:
+            return pending[0].model_copy(deep=True)
         
-        if not session_path.exists():
+        stamp = self._session_stamp(session_id)
+        if stamp is None:
+            self._session_cache.invalidate(session_id)
             return None
         
-        with open(session_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return ChatSession(**data)
+        session = self._session_cache.get(session_id, stamp)
+        if session is None:
+            session = self._read_session(session_id)
+            if session is None:
+                return None
+            self._session_cache.put(session_id, session, stamp)
+        
+        return session.model_copy(deep=True)
+    
+    def get_session_meta(self, session_id: str, student_id: Optional[str] = None) -> Optional[ChatSession]:
+        """
+        A chat session without its messages (messages is left empty), for
+        checking its version and owner without loading the history.
+        
+        Passing the expected owner as student_id lets the JSON backend answer
+        from that student's session index; summary is then left unset.
+        """
+        with self._pending_lock:
+            pending = self._pending.get(session_id)
+        if pending is not None:
+            return pending[0].model_copy(update={"messages": []}, deep=True)
+        
+        stamp = self._session_stamp(session_id)
+        if stamp is None:
+            self._session_cache.invalidate(session_id)
+            return None
+        
+        session = self._session_cache.get(session_id, stamp)
+        if session is not None:
+            return session.model_copy(update={"messages": []}, deep=True)
+        meta = self._read_session_meta(session_id, student_id)
+        return ChatSession(**meta) if meta is not None else None
+    
+    def get_messages(
+        self,
+        session_id: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        limit: int = 50
+    ) -> Optional[MessagePage]:
+        """
+        A window of a session's messages, the latest ones by default.
+        
+        Served from a pending or cached copy of the session when there is
+        one, otherwise read from the backend without loading the rest.
+        """
+        with self._pending_lock:
+            pending = self._pending.get(session_id)
+        if pending is not None:
+            return _session_message_page(pending[0], before, after, limit)
+        
+        stamp = self._session_stamp(session_id)
+        if stamp is None:
+            self._session_cache.invalidate(session_id)
+            return None
+        
+        session = self._session_cache.get(session_id, stamp)
+        if session is not None:
+            return _session_message_page(session, before, after, limit)
+        return self._read_messages(session_id, before, after, limit)
     
     def get_student_sessions(self, student_id: str) -> List[ChatSession]:
+        """Get all sessions for a student, newest first."""
+        sessions = {session.session_id: session for session in self._read_student_sessions(student_id)}
+        with self._pending_lock:
+            pending = [session for session, _ in self._pending.values() if session.student_id == student_id]
+        for session in pending:
+            sessions[session.session_id] = session.model_copy(deep=True)
+        
+        return sorted(sessions.values(), key=lambda s: s.created_at, reverse=True)
+    
+    def get_session_summaries(
+        self,
+        student_id: str,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+        descending: bool = True
+    ) -> List[SessionSummary]:
+        """One page of a student's session summaries, ordered by updated_at."""
+        with self._pending_lock:
+            pending = [
+                session_summary(session) for session, _ in self._pending.values()
+                if session.student_id == student_id
+            ]
+        
+        # Stored copies of pending sessions are stale; fetch extra to make up for dropping them
+        pending_ids = {summary.session_id for summary in pending}
+        summaries = [
+            summary for summary in self._read_session_summaries(student_id, limit + len(pending), after, descending)
+            if summary.session_id not in pending_ids
+        ]
+        summaries += _page_after(pending, after, descending)
+        return sorted(summaries, key=_summary_key, reverse=descending)[:limit]
+    
+    def _commit_session(self, session: ChatSession) -> None:
+        """Write-behind save: commit a copy in memory for the writer thread."""
+        with self._pending_lock:
+            pending = self._pending.get(session.session_id)
+            if pending is not None and pending[0].version != session.version:
+                raise SessionConflictError(
+                    f"Session {session.session_id} was saved by another request "
+                    f"(committed version {pending[0].version}, expected {session.version})"
+                )
+            # The first commit since the last flush was loaded at the stored version
+            stored_version = pending[1] if pending is not None else session.version
+            session.version += 1
+            self._pending[session.session_id] = (
+                session.model_copy(update={"messages": list(session.messages)}), stored_version
+            )
+            self.commits += 1
+    
+    def _merge_session(self, session: ChatSession) -> ChatSession:
+        """Put this worker's messages on top of a session another worker saved since."""
+        stored = self._read_session(session.session_id)
+        seen = {(m.timestamp, m.role, m.content) for m in stored.messages}
+        stored.messages.extend(
+            m for m in session.messages if (m.timestamp, m.role, m.content) not in seen
+        )
+        stored.teaching_mode = session.teaching_mode
+        stored.updated_at = session.updated_at
+        stored.version += 1
+        return stored
+    
+    def flush(self) -> None:
+        """Persist every session committed in memory (write-behind mode)."""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch = list(self._pending.items())
+            if not batch:
+                return
+            
+            start = time.perf_counter()
+            for session_id, (session, stored_version) in batch:
+                written, merged = session, False
+                try:
+                    for attempt in range(3):
+                        try:
+                            stamp = self._write_session(written, stored_version)
+                            break
+                        except SessionConflictError:
+                            if attempt == 2:
+                                raise
+                            written, merged = self._merge_session(session), True
+                            stored_version = written.version - 1
+                except Exception as e:
+                    # Stays pending and is retried on the next flush
+                    self.flush_errors += 1
+                    print(f"[Storage] Failed to flush session {session_id}: {str(e)}")
+                    continue
+                
+                self._cache_written_session(written, stamp)
+                self.flushed_sessions += 1
+                self.flush_merges += merged
+                with self._pending_lock:
+                    current = self._pending.get(session_id)
+                    if current is not None and current[0] is session:
+                        del self._pending[session_id]
+                    elif current is not None and not merged:
+                        # Committed again meanwhile; that copy builds on what was just written
+                        self._pending[session_id] = (current[0], written.version)
+                    # After a merge the newer copy lacks the other worker's
+                    # messages, so it keeps its old stored version and merges too
+            
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+    
+    def _write_behind_loop(self) -> None:
+        interval = settings.session_flush_interval_ms / 1000
+        while not self._stop_writer.wait(interval):
+            self.flush()
+    
+    def close(self) -> None:
+        """Stop the background writer and flush everything still pending."""
+        if self._writer is not None:
+            self._stop_writer.set()
+            self._writer.join()
+            self._writer = None
+        self.flush()
+    
+    def persistence_stats(self) -> Dict:
+        """Write-behind commit and flush counters."""
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "durability": self.durability,
+            "pending_sessions": pending,
+            "commits": self.commits,
+            "flushes": self.flushes,
+            "flushed_sessions": self.flushed_sessions,
+            "flush_merges": self.flush_merges,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+    
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        """Run a blocking storage call on the storage thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args))
+    
+    async def asave_profile(self, profile: StudentProfile, expected_updated_at: Optional[datetime] = None) -> None:
+        await self._run(self.save_profile, profile, expected_updated_at)
+    
+    async def aget_profile(self, student_id: str) -> Optional[StudentProfile]:
+        return await self._run(self.get_profile, student_id)
+    
+    async def aget_profile_by_email(self, email: str) -> Optional[StudentProfile]:
+        return await self._run(self.get_profile_by_email, email)
+    
+    async def asave_session(self, session: ChatSession) -> None:
+        if self.durability == "write_behind":
+            self.save_session(session)  # In-memory commit; no I/O to wait for
+        else:
+            await self._run(self.save_session, session)
+    
+    async def aget_session(self, session_id: str) -> Optional[ChatSession]:
+        return await self._run(self.get_session, session_id)
+    
+    async def aget_session_meta(self, session_id: str, student_id: Optional[str] = None) -> Optional[ChatSession]:
+        return await self._run(self.get_session_meta, session_id, student_id)
+    
+    async def aget_messages(
+        self,
+        session_id: str,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        limit: int = 50
+    ) -> Optional[MessagePage]:
+        return await self._run(self.get_messages, session_id, before, after, limit)
+    
+    async def aget_student_sessions(self, student_id: str) -> List[ChatSession]:
+        return await self._run(self.get_student_sessions, student_id)
+    
+    async def aget_session_summaries(
+        self,
+        student_id: str,
+        limit: int,
+        after: Optional[Tuple[datetime, str]] = None,
+        descending: bool = True
+    ) -> List[SessionSummary]:
+        return await self._run(self.get_session_summaries, student_id, limit, after, descending)
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss counters of the profile and session caches."""
+        return {
+            "profiles": self._profile_cache.stats(),
+            "sessions": self._session_cache.stats(),
+        }
+
+
+class JSONStorageService(StorageService):
+    """Storage backend keeping one JSON file per profile and session."""
+    
+    def __init__(
+        self,
+        data_dir: Optional[str] = None,
+        session_storage_mode: Optional[str] = None,
+        layout: Optional[str] = None
+    ):
+        super().__init__()
+        self.data_dir = Path(data_dir or settings.data_dir)
+        self.session_storage_mode = session_storage_mode or settings.session_storage_mode
+        self.layout = layout or settings.storage_layout
+        self.other_layout = "flat" if self.layout == "sharded" else "sharded"
+        self.profiles_dir = self.data_dir / "profiles"
+        self.sessions_dir = self.data_dir / "sessions"
+        self.email_index_path = self.data_dir / "email_index.json"
+        # Touched when a profile rewrite (not a new profile) bumped the profiles
+        # directory's mtime, so the email index does not look stale
+        self.email_index_checked_path = self.data_dir / "email_index.checked"
+        self.session_index_dir = self.data_dir / "session_index"
+        self.locks_dir = self.data_dir / "locks"
+        self.email_index_lock_path = self.locks_dir / "email_index.lock"
+        
+        # Create directories if they don't exist
+        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.locks_dir.mkdir(parents=True, exist_ok=True)
+        
+        # While files remain in the other layout (until migrate_storage_layout.py
+        # has moved them), reads fall back to it and writes move them over first
+        self.layout_fallback = any(
+            self._has_layout_files(base, self.other_layout)
+            for base in (self.profiles_dir, self.sessions_dir)
+        )
+        
+        # Guards the in-memory indexes and their files against concurrent writers
+        self._index_lock = threading.RLock()
+        
+        if self._session_index_is_stale():
+            self._rebuild_session_index()
+        
+        # session_id -> (message count, meta records, file size) for session logs
+        self._log_state: Dict[str, Tuple[int, int, int]] = {}
+        
+        # session_id -> (file stamp, version) as last written or read by a save
+        self._session_versions: Dict[str, Tuple[Tuple[int, int], int]] = {}
+        
+        # Email -> student_id index (lowercased emails), mirroring email_index.json
+        # as of the file stamp it was last read or written at
+        self._email_index: Dict[str, str] = {}
+        self._email_by_student: Dict[str, str] = {}
+        self._email_index_stamp: Optional[Tuple[int, int, int]] = None
+        self._load_email_index()
+    
+    def _layout_path(self, base: Path, key: str, suffix: str, layout: Optional[str] = None) -> Path:
+        """
+        Where a record's file lives: base/<key><suffix> in the flat layout,
+        base/ab/cd/<key><suffix> (from the md5 of key) in the sharded one.
+        """
+        if (layout or self.layout) == "flat":
+            return base / f"{key}{suffix}"
+        digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return base / digest[:2] / digest[2:4] / f"{key}{suffix}"
+    
+    def _stripe_lock(self, namespace: str, key: str) -> Path:
+        """
+        Lock file serializing writes to a record across workers.
+        
+        A fixed pool of LOCK_STRIPES files per namespace ("profiles",
+        "sessions", "session_index") keeps lock files out of the data
+        directories; unrelated records sharing a stripe only wait briefly.
+        Never take two locks of the same namespace at once.
+        """
+        stripe = int(hashlib.md5(key.encode("utf-8")).hexdigest()[:8], 16) % LOCK_STRIPES
+        return self.locks_dir / f"{namespace}-{stripe:03d}.lock"
+    
+    def _has_layout_files(self, base: Path, layout: str) -> bool:
+        """Check whether any record is stored in the given layout."""
+        with os.scandir(base) as entries:
+            for entry in entries:
+                if layout == "flat" and entry.is_file() and entry.name.endswith((".json", ".jsonl")):
+                    return True
+                if layout == "sharded" and entry.is_dir() and len(entry.name) == 2:
+                    return True
+        return False
+    
+    def _stored_candidates(self, base: Path, key: str, suffix: str) -> List[Path]:
+        """
+        Paths to try, in order, when reading a record file.
+        
+        The current layout is tried again last: a file moved there from the
+        other layout between the first two attempts is still found.
+        """
+        path = self._layout_path(base, key, suffix)
+        if not self.layout_fallback:
+            return [path]
+        return [path, self._layout_path(base, key, suffix, self.other_layout), path]
+    
+    def _stat_stored(self, base: Path, key: str, suffix: str) -> Optional[os.stat_result]:
+        for path in self._stored_candidates(base, key, suffix):
+            try:
+                return path.stat()
+            except FileNotFoundError:
+                continue
+        return None
+    
+    def _open_stored(self, base: Path, key: str, suffix: str) -> Optional[BinaryIO]:
+        """Open a record file in either layout for reading, or return None."""
+        for path in self._stored_candidates(base, key, suffix):
+            try:
+                return open(path, 'rb')
+            except FileNotFoundError:
+                continue
+        return None
+    
+    def _iter_stored_files(self, base: Path, suffix: str) -> Iterator[Path]:
+        """Yield every record file with the suffix, in both layouts."""
+        yield from base.glob(f"*{suffix}")
+        yield from base.glob(f"??/??/*{suffix}")
+    
+    def _adopt_record(self, kind: str, key: str) -> bool:
+        """
+        Move a record's files from the other layout into the current one.
+        
+        The caller must hold the record's lock. A file already present in
+        the current layout is newer (reads prefer it), so the old copy is
+        dropped. Returns whether anything was found in the other layout.
+        """
+        if not self.layout_fallback:
+            return False
+        base = self.profiles_dir if kind == "profiles" else self.sessions_dir
+        found = False
+        for suffix in RECORD_SUFFIXES[kind]:
+            old_path = self._layout_path(base, key, suffix, self.other_layout)
+            if not old_path.exists():
+                continue
+            found = True
+            new_path = self._layout_path(base, key, suffix)
+            if new_path.exists():
+                old_path.unlink()
+            else:
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(old_path, new_path)
+        return found
+    
+    def iter_unmigrated(self, kind: str) -> Iterator[str]:
+        """Yield the keys of records (profiles or sessions) still stored in the other layout."""
+        base = self.profiles_dir if kind == "profiles" else self.sessions_dir
+        seen = set()
+        for suffix in RECORD_SUFFIXES[kind]:
+            pattern = f"*{suffix}" if self.other_layout == "flat" else f"??/??/*{suffix}"
+            for path in base.glob(pattern):
+                key = path.name[:-len(suffix)]
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+    
+    def migrate_record(self, kind: str, key: str) -> bool:
+        """Move one record into the current layout, safely alongside running workers."""
+        with _exclusive_file_lock(self._stripe_lock(kind, key)):
+            return self._adopt_record(kind, key)
+    
+    def finish_layout_migration(self) -> None:
+        """
+        After every record was migrated: remove emptied shard directories
+        and per-record lock files left by older versions (locks now live
+        in locks/), and mark the indexes current again. Moving files changed
+        the data directories' mtimes, not the records the indexes describe.
+        """
+        for base in (self.profiles_dir, self.sessions_dir, self.session_index_dir):
+            for lock_path in self._iter_stored_files(base, ".lock"):
+                lock_path.unlink(missing_ok=True)
+        if self.layout == "flat":
+            for base in (self.profiles_dir, self.sessions_dir):
+                for shard in sorted(base.glob("??/??"), reverse=True) + sorted(base.glob("??")):
+                    try:
+                        shard.rmdir()
+                    except OSError:  # Not empty
+                        pass
+        self.layout_fallback = any(
+            self._has_layout_files(base, self.other_layout)
+            for base in (self.profiles_dir, self.sessions_dir)
+        )
+        if self.email_index_path.exists():
+            os.utime(self.email_index_path)
+        os.utime(self.session_index_dir)
+    
+    def _email_index_is_stale(self) -> bool:
+        """Check whether profiles were added or removed since the index was written."""
+        if not self.email_index_path.exists():
+            return True
+        current_at = self.email_index_path.stat().st_mtime_ns
+        if self.email_index_checked_path.exists():
+            current_at = max(current_at, self.email_index_checked_path.stat().st_mtime_ns)
+        return self.profiles_dir.stat().st_mtime_ns > current_at
+    
+    def _load_email_index(self) -> None:
+        """Load the email index from disk, rebuilding it if missing or stale."""
+        if self._email_index_is_stale() or not self._refresh_email_index():
+            self._rebuild_email_index()
+    
+    def _refresh_email_index(self) -> bool:
+        """
+        Reload the email index if another worker rewrote the file since this
+        one last read or wrote it. Returns False if the file is unreadable.
+        """
+        try:
+            with open(self.email_index_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if stamp == self._email_index_stamp:
+                    return True
+                emails = json.loads(f.read())
+        except (OSError, ValueError):
+            return False
+        
+        with self._index_lock:
+            self._email_index = dict(emails)
+            self._email_by_student = {sid: email for email, sid in emails.items()}
+            self._email_index_stamp = stamp
+        return True
+    
+    def _rebuild_email_index(self) -> None:
+        """Rebuild the email index by scanning every profile file."""
+        with self._index_lock, _exclusive_file_lock(self.email_index_lock_path):
+            self._scan_email_index()
+    
+    def _scan_email_index(self) -> None:
+        """Rebuild and write the email index; the caller holds its file lock."""
+        self._email_index = {}
+        self._email_by_student = {}
+        
+        for profile_file in self._iter_stored_files(self.profiles_dir, ".json"):
+            with open(profile_file, 'rb') as f:
+                data = decode(f.read())
+            email = data.get('email', '').lower()
+            if email:
+                self._email_index[email] = data['student_id']
+                self._email_by_student[data['student_id']] = email
+        
+        self._write_email_index()
+    
+    def _write_email_index(self) -> None:
+        """Atomically persist the email index; the caller holds its file lock."""
+        tmp_path = self.email_index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._email_index, f)
+        os.replace(tmp_path, self.email_index_path)
+        stat = self.email_index_path.stat()
+        self._email_index_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    def _check_email_free(self, profile: StudentProfile) -> None:
+        """Raise EmailTakenError if another stored profile uses the profile's email."""
+        owner = self._email_index.get(profile.email.lower())
+        # An entry whose profile was removed outside this service does not count
+        if owner not in (None, profile.student_id) and self._profile_stamp(owner) is not None:
+            raise EmailTakenError(f"Another profile already uses the email {profile.email}")
+    
+    def _index_email(self, profile: StudentProfile) -> None:
+        """
+        Point the profile's email at its student_id, dropping any previous email.
+        
+        The caller holds the email index lock and has just reloaded the file,
+        so entries added by other workers are kept.
+        """
+        email = profile.email.lower()
+        old_email = self._email_by_student.get(profile.student_id)
+        if old_email is not None and old_email != email:
+            self._email_index.pop(old_email, None)
+        self._email_index[email] = profile.student_id
+        self._email_by_student[profile.student_id] = email
+        self._write_email_index()
+    
+    def _write_profile(self, profile: StudentProfile, expected_updated_at: Optional[datetime]) -> Tuple[int, int]:
+        """Save student profile to JSON file."""
+        profile_path = self._layout_path(self.profiles_dir, profile.student_id, ".json")
+        
+        # The lock file serializes the updated_at check and write across workers
+        with _exclusive_file_lock(self._stripe_lock("profiles", profile.student_id)):
+            self._adopt_record("profiles", profile.student_id)
+            is_new = not profile_path.exists()
+            if is_new:
+                profile_path.parent.mkdir(parents=True, exist_ok=True)
+            if expected_updated_at is not None:
+                stored = None if is_new else self._read_profile(profile.student_id)
+                if stored is None or stored.updated_at != expected_updated_at:
+                    raise ProfileConflictError(f"Profile {profile.student_id} was updated by another request")
+            
+            # The profile's lock keeps its own index entry current, so only new
+            # profiles and email changes need the (global) email index lock
+            with self._index_lock:
+                self._refresh_email_index()
+                claims_email = is_new or self._email_by_student.get(profile.student_id) != profile.email.lower()
+            if not claims_email:
+                self._replace_file(profile_path, encode(profile.model_dump(), document=True))
+                if self.layout == "flat":
+                    # Renaming into profiles/ bumped its mtime; no profile was added
+                    self.email_index_checked_path.touch()
+                return self._profile_stamp(profile.student_id)
+            
+            # Checking the email, writing the profile and updating the index
+            # under one lock keeps emails unique across workers
+            with self._index_lock, _exclusive_file_lock(self.email_index_lock_path):
+                if not self._refresh_email_index():
+                    self._scan_email_index()
+                self._check_email_free(profile)
+                
+                self._replace_file(profile_path, encode(profile.model_dump(), document=True))
+                if is_new and self.layout == "sharded":
+                    # Only the shard directory changed; the email index watches the top one
+                    os.utime(self.profiles_dir)
+                
+                # Creating the file bumps the directory mtime, so the index is
+                # written afterwards to stay newer than the profiles it covers
+                self._index_email(profile)
+                return self._profile_stamp(profile.student_id)
+    
+    def _profile_stamp(self, student_id: str) -> Optional[Tuple[int, int]]:
+        stat = self._stat_stored(self.profiles_dir, student_id, ".json")
+        return (stat.st_mtime_ns, stat.st_size) if stat else None
+    
+    def _read_profile(self, student_id: str) -> Optional[StudentProfile]:
+        """Retrieve student profile from JSON file."""
+        f = self._open_stored(self.profiles_dir, student_id, ".json")
+        if f is None:
+            return None
+        
+        with f:
+            return StudentProfile.model_validate(decode(f.read()))
+    
+    def _find_student_id_by_email(self, email: str) -> Optional[str]:
+        student_id = self._email_index.get(email.lower())
+        # Another worker may have added the profile since the index was loaded
+        if student_id is None and self._refresh_email_index():
+            student_id = self._email_index.get(email.lower())
+        return student_id
+    
+    def get_profile_by_email(self, email: str) -> Optional[StudentProfile]:
+        """Retrieve student profile by email address using the email index."""
+        profile = super().get_profile_by_email(email)
+        if profile is None and email.lower() in self._email_index:
+            # The profile was edited or removed outside this service; resync.
+            self._rebuild_email_index()
+            profile = super().get_profile_by_email(email)
+        return profile
+    
+    def _session_index_is_stale(self) -> bool:
+        """Check whether sessions were created since the session index was written."""
+        if not self.session_index_dir.exists():
+            return True
+        return self.sessions_dir.stat().st_mtime_ns > self.session_index_dir.stat().st_mtime_ns
+    
+    def _session_index_entry(self, session: ChatSession, stamp: Optional[Tuple[int, int]]) -> Dict:
+        """
+        Build the session index entry stored for a session. version is valid
+        while the session file still has the given stamp.
+        """
+        return {
+            "session_id": session.session_id,
+            "created_at": session.created_at,
+            "updated_at": session.updated_at,
+            "teaching_mode": session.teaching_mode,
+            "message_count": len(session.messages),
+            "preview": session_preview(session),
+            "version": session.version,
+            "stamp": stamp,
+        }
+    
+    def _read_session_index(self, student_id: str) -> Dict[str, Dict]:
+        """Read a student's session index, keyed by session_id."""
+        index_path = self.session_index_dir / f"{student_id}.json"
+        if not index_path.exists():
+            return {}
+        
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write_session_index(self, student_id: str, entries: Dict[str, Dict]) -> None:
+        """Atomically persist a student's session index."""
+        index_path = self.session_index_dir / f"{student_id}.json"
+        tmp_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, default=self._json_serializer)
+        os.replace(tmp_path, index_path)
+    
+    def _rebuild_session_index(self) -> None:
+        """Rebuild every student's session index by scanning all session files."""
+        with self._index_lock:
+            self.session_index_dir.mkdir(parents=True, exist_ok=True)
+            indexes: Dict[str, Dict[str, Dict]] = {}
+            
+            for session in self._iter_sessions():
+                indexes.setdefault(session.student_id, {})[session.session_id] = (
+                    self._session_index_entry(session, self._session_stamp(session.session_id))
+                )
+            
+            for stale_file in self.session_index_dir.glob("*.json"):
+                if stale_file.stem not in indexes:
+                    stale_file.unlink()
+            for student_id, entries in indexes.items():
+                self._write_session_index(student_id, entries)
+            
+            # Mark the index as current even when there was nothing to write.
+            os.utime(self.session_index_dir)
+    
+    def _index_session(self, session: ChatSession, stamp: Tuple[int, int]) -> None:
+        """
+        Add or refresh a session's entry in its student's index, as saved
+        with stamp. Called under the session's own lock (another namespace).
+        """
+        # The file lock keeps other workers from interleaving their read-modify-write
+        with self._index_lock, _exclusive_file_lock(self._stripe_lock("session_index", session.student_id)):
+            entries = self._read_session_index(session.student_id)
+            entries[session.session_id] = self._session_index_entry(session, stamp)
+            self._write_session_index(session.student_id, entries)
+    
+    def _session_json_path(self, session_id: str) -> Path:
+        return self._layout_path(self.sessions_dir, session_id, ".json")
+    
+    def _session_log_path(self, session_id: str) -> Path:
+        return self._layout_path(self.sessions_dir, session_id, ".jsonl")
+    
+    def _open_session_log(self, session_id: str) -> Optional[BinaryIO]:
+        """Open a session's log for reading, or None if it has none or an empty one."""
+        log_file = self._open_stored(self.sessions_dir, session_id, ".jsonl")
+        if log_file is not None and not os.fstat(log_file.fileno()).st_size:
+            # Nothing was ever written to it; the JSON document (if any) still holds the session
+            log_file.close()
+            return None
+        return log_file
+    
+    def _iter_sessions(self) -> Iterator[ChatSession]:
+        """Yield every stored session, whichever format and layout it is stored in."""
+        logged = set()
+        for log_file in self._iter_stored_files(self.sessions_dir, ".jsonl"):
+            with open(log_file, 'rb') as f:
+                if not os.fstat(f.fileno()).st_size:
+                    continue
+                session, _ = self._read_session_log(f)
+            logged.add(session.session_id)
+            yield session
+        for session_file in self._iter_stored_files(self.sessions_dir, ".json"):
+            log_stat = self._stat_stored(self.sessions_dir, session_file.stem, ".jsonl")
+            if session_file.stem in logged or (log_stat and log_stat.st_size):
+                continue
+            with open(session_file, 'rb') as f:
+                yield ChatSession.model_validate(decode(f.read()))
+    
+    def _sync_file(self, f) -> None:
+        """fsync a written file unless the durability level is plain "sync"."""
+        if self.durability != "sync":
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _replace_file(self, path: Path, data: bytes) -> None:
+        """
+        Write a record file atomically through a per-process temporary file;
+        other workers read without taking the lock, so must never see it half-written.
+        """
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            self._sync_file(f)
+        os.replace(tmp_path, path)
+    
+    def _log_record(self, record_type: str, payload: Dict) -> bytes:
+        """Serialize one line of a session log."""
+        return encode({"type": record_type, **payload}) + b"\n"
+    
+    def _session_meta(self, session: ChatSession) -> Dict:
+        """Session fields stored in header and meta records (everything but messages)."""
+        return session.model_dump(exclude={"messages"})
+    
+    def _read_session_log(self, f: BinaryIO) -> Tuple[ChatSession, int]:
+        """Rebuild a session from its open log; also return the number of meta records."""
+        meta: Dict = {}
+        messages: List[Dict] = []
+        meta_records = 0
+        
+        for line in f:
+            if not line.strip():
+                continue
+            record = decode(line)
+            record_type = record.pop("type")
+            if record_type == "message":
+                messages.append(record["message"])
+            else:
+                meta.update(record["session"])
+                if record_type == "meta":
+                    meta_records += 1
+        
+        return ChatSession(**meta, messages=messages), meta_records
+    
+    def _write_session_log(self, session: ChatSession) -> None:
+        """Write a compacted log: one header record followed by every message."""
+        log_path = self._session_log_path(session.session_id)
+        tmp_path = log_path.with_suffix(".tmp")
+        
+        with open(tmp_path, 'wb') as f:
+            f.write(self._log_record("header", {"session": self._session_meta(session)}))
+            for message in session.messages:
+                f.write(self._log_record("message", {"message": message.model_dump()}))
+            self._sync_file(f)
+        os.replace(tmp_path, log_path)
+        
+        self._log_state[session.session_id] = (len(session.messages), 0, log_path.stat().st_size)
+        
+        # A compacted log supersedes any legacy whole-file JSON session.
+        json_path = self._session_json_path(session.session_id)
+        if json_path.exists():
+            json_path.unlink()
+    
+    def _append_session_log(self, session: ChatSession) -> None:
+        """Append new messages and a meta record, compacting the log periodically."""
+        log_path = self._session_log_path(session.session_id)
+        if not log_path.exists() or not log_path.stat().st_size:
+            self._write_session_log(session)
+            return
+        
+        # Trust the cached state only if nobody else touched the file since.
+        state = self._log_state.get(session.session_id)
+        if state is None or state[2] != log_path.stat().st_size:
+            with open(log_path, 'rb') as f:
+                stored, meta_records = self._read_session_log(f)
+            state = (len(stored.messages), meta_records, log_path.stat().st_size)
+        persisted_count, meta_records, _ = state
+        
+        if persisted_count > len(session.messages):
+            self._write_session_log(session)
+            return
+        
+        with open(log_path, 'ab') as f:
+            for message in session.messages[persisted_count:]:
+                f.write(self._log_record("message", {"message": message.model_dump()}))
+            f.write(self._log_record("meta", {"session": self._session_meta(session)}))
+            self._sync_file(f)
+        
+        meta_records += 1
+        if meta_records >= settings.session_log_compact_threshold:
+            self._write_session_log(session)
+        else:
+            self._log_state[session.session_id] = (
+                len(session.messages), meta_records, log_path.stat().st_size
+            )
+    
+    def _session_stamp(self, session_id: str) -> Optional[Tuple[int, int]]:
+        stat = (
+            self._stat_stored(self.sessions_dir, session_id, ".jsonl")
+            or self._stat_stored(self.sessions_dir, session_id, ".json")
+        )
+        return (stat.st_mtime_ns, stat.st_size) if stat else None
+    
+    def _last_log_record(self, f: BinaryIO) -> Dict:
+        """Parse only the final line of an open session log ({} if it has none)."""
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        lines = [b""]
+        while position > 0:
+            step = min(8192, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            lines = tail.rstrip(b"\n").rsplit(b"\n", 1)
+            if len(lines) == 2:
+                break
+        return decode(lines[-1]) if lines[-1].strip() else {}
+    
+    def _stored_session_version(self, session_id: str) -> int:
+        """Version of the session on disk, re-reading it only if the file changed."""
+        stamp = self._session_stamp(session_id)
+        if stamp is None:
+            return 0
+        known = self._session_versions.get(session_id)
+        if known is not None and known[0] == stamp:
+            return known[1]
+        
+        # Appends end with a meta record carrying the version; compacted logs end with a message
+        log_file = self._open_session_log(session_id)
+        if log_file is not None:
+            with log_file:
+                record = self._last_log_record(log_file)
+            if record.get("type") == "meta":
+                return record["session"].get("version", 0)
+        session = self._read_session(session_id)
+        return session.version if session is not None else 0
+    
+    def _write_session(self, session: ChatSession, expected_version: int) -> Tuple[int, int]:
+        """Save chat session to JSON file, or append to its log in log mode."""
+        # The lock file serializes the version check and write across workers
+        with _exclusive_file_lock(self._stripe_lock("sessions", session.session_id)):
+            self._adopt_record("sessions", session.session_id)
+            is_new = self._session_stamp(session.session_id) is None
+            if is_new:
+                self._session_json_path(session.session_id).parent.mkdir(parents=True, exist_ok=True)
+            stored_version = self._stored_session_version(session.session_id)
+            if stored_version != expected_version:
+                raise SessionConflictError(
+                    f"Session {session.session_id} was saved by another request "
+                    f"(stored version {stored_version}, expected {expected_version})"
+                )
+            
+            if self.session_storage_mode == "log":
+                self._append_session_log(session)
+            else:
+                session_path = self._session_json_path(session.session_id)
+                self._replace_file(session_path, encode(session.model_dump(), document=True))
+                
+                # Switching back from log mode: the JSON file is now authoritative.
+                log_path = self._session_log_path(session.session_id)
+                if log_path.exists():
+                    log_path.unlink()
+                    self._log_state.pop(session.session_id, None)
+            
+            stamp = self._session_stamp(session.session_id)
+            self._session_versions[session.session_id] = (stamp, session.version)
+            if is_new and self.layout == "sharded":
+                # Only the shard directory changed; the session index watches the top one
+                os.utime(self.sessions_dir)
+            
+            # Still under the session's lock, so index entries land in save order
+            self._index_session(session, stamp)
+            return stamp
+    
+    def _read_session(self, session_id: str) -> Optional[ChatSession]:
+        """Retrieve chat session from its log or JSON file."""
+        log_file = self._open_session_log(session_id)
+        if log_file is not None:
+            with log_file:
+                session, meta_records = self._read_session_log(log_file)
+                self._log_state[session_id] = (
+                    len(session.messages), meta_records, os.fstat(log_file.fileno()).st_size
+                )
+            return session
+        
+        session_file = self._open_stored(self.sessions_dir, session_id, ".json")
+        if session_file is None:
+            return None
+        
+        with session_file:
+            return ChatSession.model_validate(decode(session_file.read()))
+    
+    def _read_session_meta(self, session_id: str, student_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Take the fields from the student's session index while its entry
+        matches the session file's stamp. Otherwise, from a session log read
+        its last meta record (or header if it was just compacted); a
+        whole-file JSON session has to be parsed.
+        """
+        if student_id is not None:
+            entry = self._read_session_index(student_id).get(session_id)
+            stamp = entry and entry.get("stamp")
+            if stamp and tuple(stamp) == self._session_stamp(session_id):
+                return {
+                    "session_id": session_id,
+                    "student_id": student_id,
+                    "teaching_mode": entry["teaching_mode"],
+                    "version": entry["version"],
+                    "created_at": entry["created_at"],
+                    "updated_at": entry["updated_at"],
+                }
+        
+        log_file = self._open_session_log(session_id)
+        if log_file is not None:
+            with log_file:
+                record = self._last_log_record(log_file)
+                if record and record["type"] != "meta":
+                    log_file.seek(0)
+                    record = decode(log_file.readline())
+            if record:
+                return record["session"]
+        
+        session_file = self._open_stored(self.sessions_dir, session_id, ".json")
+        if session_file is None:
+            return None
+        
+        with session_file:
+            data = decode(session_file.read())
+        data.pop("messages", None)
+        return data
+    
+    def _read_messages(
+        self,
+        session_id: str,
+        before: Optional[int],
+        after: Optional[int],
+        limit: int
+    ) -> Optional[MessagePage]:
+        """
+        Decode only the log lines of the requested messages; a whole-file
+        JSON session is parsed but only the window is validated.
+        """
+        log_file = self._open_session_log(session_id)
+        if log_file is not None:
+            with log_file:
+                lines = log_file.read().splitlines()
+            header = decode(lines[0])["session"]
+            # Log records are written by _log_record, so message lines share this prefix
+            message_lines = [line for line in lines if line.startswith(MESSAGE_RECORD_PREFIXES)]
+            total = len(message_lines)
+            start, stop = message_window(total, before, after, limit)
+            messages = [Message.model_validate(decode(line)["message"]) for line in message_lines[start:stop]]
+            return message_page(session_id, header["student_id"], messages, start, total)
+        
+        session_file = self._open_stored(self.sessions_dir, session_id, ".json")
+        if session_file is None:
+            return None
+        
+        # One JSON document: the whole file has to be decoded, but only the
+        # window's raw message dicts are validated
+        with session_file:
+            data = decode(session_file.read())
+        total = len(data["messages"])
+        start, stop = message_window(total, before, after, limit)
+        messages = [Message.model_validate(message) for message in data["messages"][start:stop]]
+        return message_page(session_id, data["student_id"], messages, start, total)
+    
+    def _read_session_summaries(
+        self,
+        student_id: str,
+        limit: int,
+        after: Optional[Tuple[datetime, str]],
+        descending: bool
+    ) -> List[SessionSummary]:
+        """Summaries from the student's session index file."""
+        summaries = [SessionSummary(**entry) for entry in self._read_session_index(student_id).values()]
+        summaries = _page_after(summaries, after, descending)
+        return sorted(summaries, key=_summary_key, reverse=descending)[:limit]
+    
+    def _read_student_sessions(self, student_id: str) -> List[ChatSession]:
         """Get all sessions for a student."""
         sessions = []
         
-        for session_file in self.sessions_dir.glob("*.json"):
-            with open(session_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if data.get('student_id') == student_id:
-                    sessions.append(ChatSession(**data))
+        for session_id in self._read_session_index(student_id):
+            session = self.get_session(session_id)
+            if session is not None:
+                sessions.append(session)
         
-        return sorted(sessions, key=lambda s: s.created_at, reverse=True)
+        return sessions
+
+
+def create_storage_service() -> StorageService:
+    """Create the storage backend selected in settings."""
+    if settings.storage_backend == "sqlite":
+        from src.services.sqlite_storage_service import SQLiteStorageService
+        return SQLiteStorageService()
+    return JSONStorageService()
 
 
-storage_service = StorageService()
\ No newline at end of file
+storage_service = create_storage_service()
@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from typing import Dict, Optional
+from src.config.settings import settings
+
+
+class InvalidTokenError(ValueError):
+    """Raised when a token is malformed, forged, expired or of the wrong type."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class TokenService:
+    """
+    Stateless HMAC-SHA256 signed tokens.
+    
+    A token is base64url(payload) + "." + base64url(signature), where payload
+    holds the student_id ("sub"), the token type ("access" or "refresh") and an
+    expiry timestamp. Verification is a single HMAC and never touches storage.
+    """
+    
+    def __init__(self, secret: Optional[str] = None):
+        secret = secret or settings.token_secret
+        if not secret:
+            secret = secrets.token_urlsafe(32)
+            print("[Token Service] TOKEN_SECRET is not set; using a random secret. "
+                  "Tokens will not survive restarts or work across workers.")
+        self._key = secret.encode("utf-8")
+    
+    def _sign(self, payload: bytes) -> str:
+        return _b64encode(hmac.new(self._key, payload, hashlib.sha256).digest())
+    
+    def issue(self, student_id: str, token_type: str = "access") -> str:
+        """Issue a signed token of the given type for a student."""
+        ttl = (
+            settings.access_token_ttl_seconds if token_type == "access"
+            else settings.refresh_token_ttl_seconds
+        )
+        payload = _b64encode(json.dumps(
+            {"sub": student_id, "typ": token_type, "exp": int(time.time()) + ttl},
+            separators=(",", ":")
+        ).encode("utf-8"))
+        return f"{payload}.{self._sign(payload.encode('ascii'))}"
+    
+    def verify(self, token: str, token_type: str = "access") -> Dict:
+        """Return the token's claims, or raise InvalidTokenError."""
+        try:
+            payload, signature = token.split(".")
+            expected = self._sign(payload.encode("ascii"))
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+        
+        if not hmac.compare_digest(signature.encode("ascii", "replace"), expected.encode("ascii")):
+            raise InvalidTokenError("Invalid token signature")
+        
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+        
+        if claims.get("typ") != token_type:
+            raise InvalidTokenError(f"Not a valid {token_type} token")
+        if claims.get("exp", 0) < time.time():
+            raise InvalidTokenError("Token has expired")
+        return claims
+
+
+token_service = TokenService()
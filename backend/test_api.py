@@ -17,31 +17,37 @@ def test_health_check():
     print(f"Response: {json.dumps(response.json(), indent=2)}\n")
 
 
-def test_create_profile():
-    """Test creating a student profile."""
-    print("Testing profile creation...")
+def test_signup():
+    """Test signing up; returns (student_id, auth headers)."""
+    print("Testing signup...")
     data = {
         "name": "Test Student",
         "email": "test@example.com",
+        "password": "test-password",
         "current_level": "A2",
         "goals": ["Learn German", "Pass B1 exam"],
         "target_exam": "Goethe B1",
         "career_interest": "Engineering"
     }
     
-    response = requests.post(f"{BASE_URL}/api/students/profile", json=data)
+    response = requests.post(f"{BASE_URL}/api/auth/signup", json=data)
+    if response.status_code == 400:
+        # Already signed up by an earlier run
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": data["email"], "password": data["password"]
+        })
     print(f"Status: {response.status_code}")
     
-    if response.status_code == 201:
-        profile = response.json()
-        print(f"Profile created: {json.dumps(profile, indent=2)}\n")
-        return profile["student_id"]
+    if response.status_code == 200:
+        auth = response.json()
+        print(f"Profile: {json.dumps(auth['profile'], indent=2)}\n")
+        return auth["profile"]["student_id"], {"Authorization": f"Bearer {auth['access_token']}"}
     else:
         print(f"Error: {response.text}\n")
-        return None
+        return None, None
 
 
-def test_chat(student_id):
+def test_chat(student_id, headers):
     """Test sending a chat message."""
     if not student_id:
         print("Skipping chat test - no student ID\n")
@@ -54,7 +60,7 @@ def test_chat(student_id):
         "teaching_mode": "grammar_practice"
     }
     
-    response = requests.post(f"{BASE_URL}/api/chat/message", json=data)
+    response = requests.post(f"{BASE_URL}/api/chat/message", json=data, headers=headers)
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -66,14 +72,14 @@ def test_chat(student_id):
         return None
 
 
-def test_get_profile(student_id):
+def test_get_profile(student_id, headers):
     """Test retrieving a profile."""
     if not student_id:
         print("Skipping profile retrieval test - no student ID\n")
         return
     
     print("Testing profile retrieval...")
-    response = requests.get(f"{BASE_URL}/api/students/profile/{student_id}")
+    response = requests.get(f"{BASE_URL}/api/students/profile/{student_id}", headers=headers)
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -92,17 +98,17 @@ def main():
         # Test 1: Health check
         test_health_check()
         
-        # Test 2: Create profile
-        student_id = test_create_profile()
+        # Test 2: Sign up (or log in) and get a bearer token
+        student_id, headers = test_signup()
         
         # Test 3: Get profile
-        test_get_profile(student_id)
+        test_get_profile(student_id, headers)
         
         # Test 4: Chat (requires API key)
         print("⚠️  Chat test requires a valid API key in .env")
         user_input = input("Run chat test? (y/n): ")
         if user_input.lower() == 'y':
-            test_chat(student_id)
+            test_chat(student_id, headers)
         
         print("=" * 60)
         print("Tests completed!")
@@ -2,8 +2,9 @@
 GermanLeap - Lea AI Tutor Frontend
 A Streamlit-based interface for the German language learning AI tutor.
 """
+import uuid
 import streamlit as st
-from services.api_client import api_client
+from services.api_client import APIClient
 
 # Page configuration
 st.set_page_config(
@@ -99,12 +100,22 @@ def init_session_state():
         st.session_state.chat_messages = []
     if "session_id" not in st.session_state:
         st.session_state.session_id = None
+    if "earlier_cursor" not in st.session_state:
+        st.session_state.earlier_cursor = None  # Set while older messages are not loaded
     if "teaching_mode" not in st.session_state:
         st.session_state.teaching_mode = None
     if "page" not in st.session_state:
         st.session_state.page = "auth"
     if "auth_mode" not in st.session_state:
         st.session_state.auth_mode = "login"  # 'login' or 'signup'
+    if "api_client" not in st.session_state:
+        # One client per browser session so auth tokens are never shared between users
+        st.session_state.api_client = APIClient()
+
+
+def get_api_client() -> APIClient:
+    """API client holding this browser session's auth tokens."""
+    return st.session_state.api_client
 
 
 def render_header():
@@ -168,7 +179,7 @@ def render_login_form():
             else:
                 try:
                     with st.spinner("Logging in..."):
-                        response = api_client.login(email=email, password=password)
+                        response = get_api_client().login(email=email, password=password)
                         st.session_state.student_profile = response["profile"]
                         st.session_state.page = "chat"
                         st.success("Login successful! 🎉")
@@ -237,7 +248,7 @@ def render_signup_form():
             else:
                 try:
                     with st.spinner("Creating your account..."):
-                        response = api_client.signup(
+                        response = get_api_client().signup(
                             name=name,
                             email=email,
                             password=password,
@@ -259,6 +270,35 @@ def render_signup_form():
     st.markdown("Already have an account? Click **Login** above to sign in.")
 
 
+# Messages fetched per page when resuming a chat or loading earlier messages
+MESSAGE_PAGE_SIZE = 30
+
+
+def to_chat_messages(messages: list) -> list:
+    """Keep only what the chat view needs from API messages."""
+    return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+
+def resume_chat(session: dict):
+    """Open a previous chat, showing only its latest messages."""
+    page = get_api_client().get_messages(session["session_id"], limit=MESSAGE_PAGE_SIZE)
+    st.session_state.session_id = session["session_id"]
+    st.session_state.teaching_mode = session.get("teaching_mode")
+    st.session_state.chat_messages = to_chat_messages(page["messages"])
+    st.session_state.earlier_cursor = page["earlier_cursor"]
+
+
+def load_earlier_messages():
+    """Prepend the page of messages before the oldest one shown."""
+    page = get_api_client().get_messages(
+        st.session_state.session_id,
+        limit=MESSAGE_PAGE_SIZE,
+        before=st.session_state.earlier_cursor
+    )
+    st.session_state.chat_messages = to_chat_messages(page["messages"]) + st.session_state.chat_messages
+    st.session_state.earlier_cursor = page["earlier_cursor"]
+
+
 def render_sidebar():
     """Render the sidebar with profile info and teaching modes."""
     with st.sidebar:
@@ -306,13 +346,39 @@ def render_sidebar():
         if st.button("🔄 Start New Chat", use_container_width=True):
             st.session_state.chat_messages = []
             st.session_state.session_id = None
+            st.session_state.earlier_cursor = None
             st.rerun()
         
+        # Recent chats
+        if profile:
+            try:
+                recent = get_api_client().get_session_summaries(profile["student_id"], limit=5)["sessions"]
+            except Exception:
+                recent = []
+            if recent:
+                st.markdown("### 🕘 Recent Chats")
+            for session in recent:
+                label = session.get("preview") or "Empty chat"
+                if st.button(
+                    label if len(label) <= 40 else label[:39] + "…",
+                    key=f"session_{session['session_id']}",
+                    use_container_width=True,
+                    help=f"{session['message_count']} messages"
+                ):
+                    try:
+                        resume_chat(session)
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+                    else:
+                        st.rerun()
+        
         # Logout button
         if st.button("🚪 Logout", use_container_width=True):
+            get_api_client().clear_tokens()
             st.session_state.student_profile = None
             st.session_state.chat_messages = []
             st.session_state.session_id = None
+            st.session_state.earlier_cursor = None
             st.session_state.page = "welcome"
             st.rerun()
 
@@ -359,6 +425,16 @@ def render_chat_page():
             with st.chat_message("assistant", avatar="🧑‍🏫"):
                 st.markdown(welcome_text)
         
+        # Older messages of a resumed chat are fetched on demand
+        if st.session_state.earlier_cursor is not None:
+            if st.button("⬆️ Load earlier messages", key="load_earlier"):
+                try:
+                    load_earlier_messages()
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+                else:
+                    st.rerun()
+        
         # Display message history
         for msg in st.session_state.chat_messages:
             role = msg["role"]
@@ -376,38 +452,50 @@ def render_chat_page():
         with st.chat_message("user", avatar="👤"):
             st.markdown(prompt)
         
-        # Get response from Lea
+        # Resending a message that just failed reuses its request, so the
+        # backend replays that turn rather than answering it twice
+        pending = st.session_state.get("pending_request")
+        if not pending or pending["message"] != prompt:
+            pending = {
+                "student_id": st.session_state.student_profile["student_id"],
+                "message": prompt,
+                "session_id": st.session_state.session_id,
+                "teaching_mode": st.session_state.teaching_mode,
+                "idempotency_key": str(uuid.uuid4())
+            }
+            st.session_state.pending_request = pending
+        
+        # Stream response from Lea as it is generated
         with st.chat_message("assistant", avatar="🧑‍🏫"):
-            with st.spinner("Lea is thinking..."):
-                try:
-                    response = api_client.send_message(
-                        student_id=st.session_state.student_profile["student_id"],
-                        message=prompt,
-                        session_id=st.session_state.session_id,
-                        teaching_mode=st.session_state.teaching_mode
-                    )
-                    
-                    # Update session ID
-                    st.session_state.session_id = response["session_id"]
-                    
-                    # Display and store response
-                    assistant_message = response["message"]
-                    st.markdown(assistant_message)
-                    st.session_state.chat_messages.append({
-                        "role": "assistant",
-                        "content": assistant_message
-                    })
-                    
-                except ConnectionError as e:
-                    st.error(f"⚠️ {str(e)}")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            def response_tokens():
+                events = get_api_client().stream_message(**pending)
+                for event, data in events:
+                    if event == "token":
+                        yield data["delta"]
+                    elif event == "done":
+                        # Adopt the session ID only once the turn is saved; the
+                        # "session" event arrives before anything is stored
+                        st.session_state.session_id = data["session_id"]
+            
+            try:
+                # Display and store response
+                assistant_message = st.write_stream(response_tokens())
+                st.session_state.chat_messages.append({
+                    "role": "assistant",
+                    "content": assistant_message
+                })
+                st.session_state.pending_request = None
+            
+            except ConnectionError as e:
+                st.error(f"⚠️ {str(e)}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
 
 
 def check_backend_connection():
     """Check if the backend is reachable."""
     try:
-        api_client.health_check()
+        get_api_client().health_check()
         return True
     except Exception:
         return False
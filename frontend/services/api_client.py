@@ -1,33 +1,155 @@
 """API client for communicating with the GermanLeap backend."""
+import copy
+import json
+import uuid
+from collections import OrderedDict
 import requests
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Iterator, Tuple
 
 
 class APIClient:
     """Client for the GermanLeap Lea AI Tutor API."""
     
+    # Responses kept with their ETag for conditional re-fetches
+    VALIDATOR_CACHE_SIZE = 32
+    
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url.rstrip("/")
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        # (endpoint, params) -> (ETag, response body), least recently used first
+        self._validators: "OrderedDict[Tuple, Tuple[str, Any]]" = OrderedDict()
+    
+    def _store_tokens(self, auth_response: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep the tokens from a login/signup/refresh response."""
+        if auth_response.get("access_token"):
+            self.access_token = auth_response["access_token"]
+            self.refresh_token = auth_response.get("refresh_token")
+        return auth_response
+    
+    def clear_tokens(self) -> None:
+        """Forget the current tokens and cached responses (on logout)."""
+        self.access_token = None
+        self.refresh_token = None
+        self._validators.clear()
+    
+    def _remember(self, key: Tuple, etag: str, body: Any) -> None:
+        """Keep a response and its ETag, evicting the least recently used one."""
+        self._validators[key] = (etag, copy.deepcopy(body))
+        self._validators.move_to_end(key)
+        while len(self._validators) > self.VALIDATOR_CACHE_SIZE:
+            self._validators.popitem(last=False)
+    
+    def _refresh_access_token(self) -> bool:
+        """Exchange the refresh token for new tokens; False if it was rejected."""
+        if not self.refresh_token:
+            return False
+        response = requests.post(
+            f"{self.base_url}/api/auth/refresh",
+            json={"refresh_token": self.refresh_token},
+            timeout=10
+        )
+        if not response.ok:
+            self.clear_tokens()
+            return False
+        self._store_tokens(response.json())
+        return True
+    
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send an authenticated request, refreshing an expired access token once."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        for attempt in range(2):
+            if self.access_token:
+                headers["Authorization"] = f"Bearer {self.access_token}"
+            response = requests.request(method=method, url=url, headers=headers, **kwargs)
+            if response.status_code != 401 or attempt or not self._refresh_access_token():
+                return response
+            response.close()
+        return response
     
     def _make_request(
         self,
         method: str,
         endpoint: str,
         data: Optional[Dict] = None,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        headers: Optional[Dict] = None
     ) -> Dict[str, Any]:
-        """Make an HTTP request to the API."""
+        """
+        Make an HTTP request to the API.
+        
+        GETs of a resource fetched before send its ETag as If-None-Match,
+        and a 304 reply returns the cached body.
+        """
         url = f"{self.base_url}{endpoint}"
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        headers = dict(headers or {})
+        cached = self._validators.get(key) if method == "GET" else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
         try:
-            response = requests.request(
-                method=method,
-                url=url,
+            response = self._send(
+                method,
+                url,
                 json=data,
                 params=params,
+                headers=headers,
                 timeout=60
             )
+            if cached and response.status_code == 304:
+                self._validators.move_to_end(key)
+                return copy.deepcopy(cached[1])
             response.raise_for_status()
-            return response.json()
+            body = response.json()
+            # GET and PATCH responses carry the resource's current ETag
+            if response.headers.get("ETag"):
+                self._remember(key, response.headers["ETag"], body)
+            return body
+        except requests.exceptions.ConnectionError:
+            raise ConnectionError(
+                "Cannot connect to the backend server. "
+                "Please ensure the backend is running on " + self.base_url
+            )
+        except requests.exceptions.Timeout:
+            raise TimeoutError("Request timed out. Please try again.")
+        except requests.exceptions.HTTPError as e:
+            error_detail = "Unknown error"
+            try:
+                error_detail = e.response.json().get("detail", str(e))
+            except Exception:
+                error_detail = str(e)
+            raise Exception(f"API Error: {error_detail}")
+    
+    def _stream_request(
+        self,
+        endpoint: str,
+        data: Optional[Dict] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """POST to a Server-Sent Events endpoint and yield (event, data) pairs."""
+        url = f"{self.base_url}{endpoint}"
+        try:
+            with self._send(
+                "POST",
+                url,
+                json=data,
+                stream=True,
+                headers={"Accept": "text/event-stream"},
+                timeout=(10, 60)
+            ) as response:
+                if not response.ok:
+                    # Read the error body before the streamed response is closed
+                    response.content
+                response.raise_for_status()
+                event = "message"
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        payload = json.loads(line[len("data:"):].strip())
+                        if event == "error":
+                            raise Exception(f"API Error: {payload.get('detail', 'Unknown error')}")
+                        yield event, payload
+                        event = "message"
         except requests.exceptions.ConnectionError:
             raise ConnectionError(
                 "Cannot connect to the backend server. "
@@ -69,7 +191,7 @@ class APIClient:
             "target_exam": target_exam,
             "career_interest": career_interest
         }
-        return self._make_request("POST", "/api/auth/signup", data=data)
+        return self._store_tokens(self._make_request("POST", "/api/auth/signup", data=data))
     
     def login(self, email: str, password: str) -> Dict[str, Any]:
         """Login with existing credentials."""
@@ -77,7 +199,7 @@ class APIClient:
             "email": email,
             "password": password
         }
-        return self._make_request("POST", "/api/auth/login", data=data)
+        return self._store_tokens(self._make_request("POST", "/api/auth/login", data=data))
     
     # Student Profile endpoints
     def create_profile(
@@ -104,9 +226,20 @@ class APIClient:
         """Get a student profile by ID."""
         return self._make_request("GET", f"/api/students/profile/{student_id}")
     
-    def update_profile(self, student_id: str, updates: Dict) -> Dict[str, Any]:
-        """Update a student profile."""
-        return self._make_request("PATCH", f"/api/students/profile/{student_id}", data=updates)
+    def update_profile(self, student_id: str, updates: Dict, if_unmodified: bool = False) -> Dict[str, Any]:
+        """
+        Update a student profile.
+        
+        With if_unmodified, the update is sent with the ETag of the profile
+        as last fetched and fails (412) if it was changed since.
+        """
+        endpoint = f"/api/students/profile/{student_id}"
+        headers = {}
+        if if_unmodified:
+            if (endpoint, ()) not in self._validators:
+                self.get_profile(student_id)
+            headers["If-Match"] = self._validators[(endpoint, ())][0]
+        return self._make_request("PATCH", endpoint, data=updates, headers=headers)
     
     # Chat endpoints
     def send_message(
@@ -114,24 +247,99 @@ class APIClient:
         student_id: str,
         message: str,
         session_id: Optional[str] = None,
-        teaching_mode: Optional[str] = None
+        teaching_mode: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Send a message to Lea and get a response."""
+        """
+        Send a message to Lea and get a response.
+        
+        A request that times out is sent once more with the same idempotency
+        key, so the backend answers it from the first attempt instead of
+        asking the AI provider twice. Pass the key of an earlier failed send
+        to retry that message safely.
+        """
+        data = {
+            "student_id": student_id,
+            "message": message,
+            "session_id": session_id,
+            "teaching_mode": teaching_mode,
+            "idempotency_key": idempotency_key or str(uuid.uuid4())
+        }
+        try:
+            return self._make_request("POST", "/api/chat/message", data=data)
+        except TimeoutError:
+            return self._make_request("POST", "/api/chat/message", data=data)
+    
+    def stream_message(
+        self,
+        student_id: str,
+        message: str,
+        session_id: Optional[str] = None,
+        teaching_mode: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Send a message to Lea and stream the response.
+        
+        Yields ("session", {"session_id"}), then ("token", {"delta"}) per chunk
+        and finally ("done", <ChatResponse>) once the session has been saved.
+        Resending with the same idempotency_key (and the same other arguments)
+        replays the original turn instead of generating a new one.
+        """
         data = {
             "student_id": student_id,
             "message": message,
             "session_id": session_id,
-            "teaching_mode": teaching_mode
+            "teaching_mode": teaching_mode,
+            "idempotency_key": idempotency_key or str(uuid.uuid4())
         }
-        return self._make_request("POST", "/api/chat/message", data=data)
+        return self._stream_request("/api/chat/message/stream", data=data)
     
     def get_session(self, session_id: str) -> Dict[str, Any]:
         """Get chat session by ID."""
         return self._make_request("GET", f"/api/chat/session/{session_id}")
     
+    def get_messages(
+        self,
+        session_id: str,
+        limit: int = 50,
+        before: Optional[int] = None,
+        after: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a window of a session's messages, the latest ones by default.
+        
+        Pass earlier_cursor back as before for older messages, or
+        later_cursor as after for newer ones (None at either end).
+        """
+        params = {"limit": limit}
+        if before is not None:
+            params["before"] = before
+        if after is not None:
+            params["after"] = after
+        return self._make_request("GET", f"/api/chat/session/{session_id}/messages", params=params)
+    
     def get_student_sessions(self, student_id: str) -> Dict[str, Any]:
         """Get all chat sessions for a student."""
         return self._make_request("GET", f"/api/chat/student/{student_id}/sessions")
+    
+    def get_session_summaries(
+        self,
+        student_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order: str = "desc"
+    ) -> Dict[str, Any]:
+        """
+        Get one page of session summaries (no messages), most recently updated first.
+        
+        Returns {"sessions": [...], "next_cursor": ...}; pass next_cursor back
+        as cursor to get the following page (None on the last page).
+        """
+        params = {"view": "summary", "limit": limit, "order": order}
+        if cursor:
+            params["cursor"] = cursor
+        return self._make_request("GET", f"/api/chat/student/{student_id}/sessions", params=params)
 
 
 # Singleton instance